@@ -1,6 +1,60 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import UserProfile, ModerationLog, APIUsageLog
+from django.db import transaction
+from . import search
+from .models import (
+    UserProfile, ModerationLog, APIUsageLog, ModerationDailyStat, ModerationJob, VerdictCacheEntry, ModerationArchive,
+    RevokedToken
+)
+from .pagination import EstimatedCountPaginator
+from .rollups import move_moderation, record_moderation, record_moderations
+
+
+class LogTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for the append-only log tables.
+
+    Counts are estimated or capped, the user column is joined rather than
+    fetched per row, and there is no date hierarchy, whose drill-down runs
+    distinct-date queries over the whole table. Filters only use fixed
+    choices, so building them never queries the table.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('user',)
+
+
+class StatusClassFilter(admin.SimpleListFilter):
+    """
+    Filter by status class, as a range over the status_code index
+    """
+    title = 'status'
+    parameter_name = 'status_class'
+    
+    def lookups(self, request, model_admin):
+        return [('2', '2xx'), ('3', '3xx'), ('4', '4xx'), ('5', '5xx')]
+    
+    def queryset(self, request, queryset):
+        if self.value() in ('2', '3', '4', '5'):
+            start = int(self.value()) * 100
+            return queryset.filter(status_code__gte=start, status_code__lt=start + 100)
+        return queryset
+
+
+class MethodFilter(admin.SimpleListFilter):
+    """
+    Filter by HTTP method without a SELECT DISTINCT over the table
+    """
+    title = 'method'
+    parameter_name = 'method'
+    
+    def lookups(self, request, model_admin):
+        return [(method, method) for method in ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')]
+    
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(method=self.value())
+        return queryset
 
 
 @admin.register(UserProfile)
@@ -31,15 +85,43 @@ class UserProfileAdmin(UserAdmin):
 
 
 @admin.register(ModerationLog)
-class ModerationLogAdmin(admin.ModelAdmin):
+class ModerationLogAdmin(LogTableAdmin):
     """
     Admin interface for ModerationLog model
     """
     list_display = ('user', 'input_type', 'result', 'risk_level', 'confidence_score', 'created_at')
     list_filter = ('input_type', 'result', 'risk_level', 'created_at')
-    search_fields = ('user__username', 'user__email', 'input_value', 'notes')
+    search_fields = ('user__username', 'user__email')
+    search_help_text = "Matches usernames and emails, and whole words in the content and notes"
     readonly_fields = ('created_at', 'updated_at', 'processing_time_ms', 'ip_address', 'user_agent')
-    date_hierarchy = 'created_at'
+    raw_id_fields = ('user',)
+    
+    def save_model(self, request, obj, form, change):
+        # Keep the daily rollup in step with edits to the result and other bucket fields
+        with transaction.atomic():
+            previous = ModerationLog.objects.select_for_update().get(pk=obj.pk) if change else None
+            super().save_model(request, obj, form, change)
+            if previous is None:
+                record_moderation(obj)
+            else:
+                move_moderation(previous, obj)
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            record_moderation(obj, count=-1)
+            super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            record_moderations(queryset.select_for_update(), count=-1)
+            super().delete_queryset(request, queryset)
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Content and notes go through the full-text index instead of LIKE scans
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search.has_terms(search_term):
+            results |= queryset.filter(search.matches(search_term))
+        return results, may_have_duplicates
     
     fieldsets = (
         ('Content', {
@@ -56,12 +138,71 @@ class ModerationLogAdmin(admin.ModelAdmin):
 
 
 @admin.register(APIUsageLog)
-class APIUsageLogAdmin(admin.ModelAdmin):
+class APIUsageLogAdmin(LogTableAdmin):
     """
     Admin interface for API usage tracking
     """
     list_display = ('user', 'endpoint', 'method', 'status_code', 'response_time_ms', 'created_at')
-    list_filter = ('method', 'status_code', 'created_at')
+    list_filter = (MethodFilter, StatusClassFilter, 'created_at')
     search_fields = ('user__username', 'endpoint')
     readonly_fields = ('created_at',)
-    date_hierarchy = 'created_at'
+    raw_id_fields = ('user',)
+
+
+@admin.register(ModerationDailyStat)
+class ModerationDailyStatAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the daily moderation rollup
+    """
+    list_display = ('date', 'user', 'input_type', 'result', 'risk_level', 'count', 'processing_time_ms_total')
+    list_filter = ('input_type', 'result', 'risk_level')
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'date', 'input_type', 'result', 'risk_level', 'count', 'processing_time_ms_total')
+
+
+@admin.register(ModerationJob)
+class ModerationJobAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the asynchronous moderation queue
+    """
+    list_display = ('id', 'moderation_log', 'status', 'attempts', 'lease_expires_at', 'created_at')
+    list_filter = ('status',)
+    list_select_related = ('moderation_log__user',)
+    raw_id_fields = ('moderation_log',)
+    readonly_fields = ('created_at', 'updated_at', 'last_error')
+
+
+@admin.register(VerdictCacheEntry)
+class VerdictCacheEntryAdmin(admin.ModelAdmin):
+    """
+    Admin interface for cached moderation verdicts
+    """
+    list_display = ('content_hash', 'input_type', 'result', 'risk_level', 'ruleset_version', 'created_at')
+    list_filter = ('input_type', 'result', 'risk_level')
+    search_fields = ('content_hash',)
+    readonly_fields = ('created_at',)
+
+
+@admin.register(ModerationArchive)
+class ModerationArchiveAdmin(admin.ModelAdmin):
+    """
+    Admin interface for archived moderation log segments
+    """
+    list_display = ('month', 'row_count', 'oldest_created_at', 'newest_created_at', 'path', 'created_at')
+    date_hierarchy = 'month'
+    exclude = ('members',)
+    readonly_fields = (
+        'month', 'path', 'archived_before', 'row_count', 'min_log_id', 'max_log_id',
+        'oldest_created_at', 'newest_created_at', 'created_at'
+    )
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    """
+    Admin interface for revoked refresh tokens
+    """
+    list_display = ('jti', 'expires_at')
+    readonly_fields = ('jti', 'expires_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
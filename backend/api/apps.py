@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .matcher import get_matcher
+        from .search import install_after_migrate
+
+        post_migrate.connect(install_after_migrate, sender=self)
+
+        # Compile the keyword automaton once at startup rather than per request
+        get_matcher()
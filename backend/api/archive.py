@@ -0,0 +1,268 @@
+"""
+Retention for ModerationLog.
+
+Finished logs older than the retention window are moved, one month at a
+time, into compressed segment files catalogued by ``ModerationArchive``, so
+the live table and its indexes only cover recent activity. History reads
+merge the live and archived logs by creation time.
+"""
+import gzip
+import heapq
+import io
+import itertools
+import json
+import os
+from array import array
+from collections import deque
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ModerationArchive, ModerationLog
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'input_type', 'input_value', 'input_file', 'result', 'risk_level',
+    'confidence_score', 'flags_detected', 'perceptual_hash', 'processing_time_ms',
+    'ip_address', 'user_agent', 'notes', 'created_at', 'updated_at',
+)
+DATETIME_FIELDS = ('created_at', 'updated_at')
+DELETE_BATCH_SIZE = 500
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def archive_path(segment):
+    return os.path.join(settings.MODERATION_ARCHIVE_DIR, segment.path)
+
+
+def archivable_logs(cutoff):
+    """
+    Logs created before ``cutoff`` that may leave the live table.
+
+    Pending logs still have a job to finish, and unsafe images stay behind
+    for the near-duplicate index.
+    """
+    return (
+        ModerationLog.objects.filter(created_at__lt=cutoff)
+        .exclude(result='pending')
+        .exclude(input_type='image', result='unsafe', perceptual_hash__isnull=False)
+    )
+
+
+def archive_horizon():
+    """Return the newest cutoff any archive run used, or None"""
+    return ModerationArchive.objects.aggregate(horizon=Max('archived_before'))['horizon']
+
+
+def _month_bounds(month):
+    next_month = (month + timedelta(days=32)).replace(day=1)
+    return tuple(timezone.make_aware(datetime.combine(day, time.min)) for day in (month, next_month))
+
+
+def _encode(row):
+    for field in DATETIME_FIELDS:
+        row[field] = row[field].isoformat()
+    return json.dumps(row, separators=(',', ':')).encode() + b'\n'
+
+
+def archive_month(month, cutoff, batch_size=1000):
+    """
+    Move the archivable logs of ``month`` created before ``cutoff`` into one
+    segment. Returns the ModerationArchive row, or None if there was nothing
+    to move.
+    """
+    start, end = _month_bounds(month)
+    logs = (
+        archivable_logs(cutoff)
+        .filter(created_at__gte=start, created_at__lt=min(end, cutoff))
+        .order_by('user_id', '-created_at', '-id')
+    )
+
+    os.makedirs(settings.MODERATION_ARCHIVE_DIR, exist_ok=True)
+    name = f'moderation-{month:%Y-%m}-{timezone.now():%Y%m%dT%H%M%S%f}.jsonl.gz'
+    path = os.path.join(settings.MODERATION_ARCHIVE_DIR, name)
+    ids = array('q')
+    members = {}
+    oldest = newest = None
+    with open(f'{path}.tmp', 'wb') as archive:
+        member = None
+        for row in logs.values(*ARCHIVE_FIELDS).iterator(chunk_size=batch_size):
+            user_key = str(row['user_id'])
+            if user_key not in members:
+                if member is not None:
+                    member.close()
+                members[user_key] = [archive.tell(), 0, 0]
+                member = gzip.GzipFile(fileobj=archive, mode='wb', mtime=0)
+            ids.append(row['id'])
+            oldest = min(oldest or row['created_at'], row['created_at'])
+            newest = max(newest or row['created_at'], row['created_at'])
+            member.write(_encode(row))
+            members[user_key][2] += 1
+        if member is not None:
+            member.close()
+        archive.flush()
+        os.fsync(archive.fileno())
+
+        # Each member runs up to the next one's offset
+        offsets = [location[0] for location in members.values()] + [archive.tell()]
+        for location, following in zip(members.values(), offsets[1:]):
+            location[1] = following - location[0]
+
+    if not ids:
+        os.remove(f'{path}.tmp')
+        return None
+
+    os.replace(f'{path}.tmp', path)
+    try:
+        with transaction.atomic():
+            segment = ModerationArchive.objects.create(
+                month=month, path=name, archived_before=cutoff, row_count=len(ids),
+                min_log_id=min(ids), max_log_id=max(ids),
+                oldest_created_at=oldest, newest_created_at=newest, members=members,
+            )
+            for index in range(0, len(ids), DELETE_BATCH_SIZE):
+                ModerationLog.objects.filter(pk__in=ids[index:index + DELETE_BATCH_SIZE]).delete()
+    except BaseException:
+        os.remove(path)
+        raise
+    return segment
+
+
+def archive_logs(cutoff, batch_size=1000):
+    """Archive every month with logs created before ``cutoff``; return the new segments"""
+    months = archivable_logs(cutoff).dates('created_at', 'month')
+    segments = []
+    for month in months:
+        segment = archive_month(month, cutoff, batch_size)
+        if segment is not None:
+            segments.append(segment)
+    return segments
+
+
+class _MemberReader(io.RawIOBase):
+    """Read at most ``length`` bytes of ``file`` from its current position"""
+
+    def __init__(self, file, length):
+        self._file = file
+        self._remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._file.read(min(len(buffer), self._remaining))
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def read_member(segment, user_id):
+    """
+    Yield one user's rows from a segment as unsaved ModerationLogs, newest
+    first. The member is decompressed as it is read.
+    """
+    location = segment.members.get(str(user_id))
+    if location is None:
+        return
+    offset, length, _ = location
+    with open(archive_path(segment), 'rb') as archive:
+        archive.seek(offset)
+        with gzip.GzipFile(fileobj=_MemberReader(archive, length), mode='rb') as member:
+            for line in member:
+                row = json.loads(line)
+                for field in DATETIME_FIELDS:
+                    row[field] = parse_datetime(row[field])
+                yield ModerationLog(**row)
+
+
+def sort_key(created_at, pk):
+    """Key that orders logs newest first, as the history does"""
+    return (EPOCH - created_at, -pk)
+
+
+class ArchivedHistory:
+    """
+    One user's archived logs, newest first, with the history filters applied
+    """
+
+    def __init__(self, user, filters=None):
+        self.user = user
+        self.filters = filters or {}
+
+    def segments(self):
+        segments = ModerationArchive.objects.filter(members__has_key=str(self.user.pk))
+        if 'created_after' in self.filters:
+            segments = segments.filter(newest_created_at__gte=self.filters['created_after'])
+        if 'created_before' in self.filters:
+            segments = segments.filter(oldest_created_at__lt=self.filters['created_before'])
+        return segments.order_by('-newest_created_at')
+
+    def exists(self):
+        return self.segments().exists()
+
+    def _matches(self, log):
+        for field in ('result', 'input_type', 'risk_level'):
+            if field in self.filters and getattr(log, field) != self.filters[field]:
+                return False
+        if 'created_after' in self.filters and log.created_at < self.filters['created_after']:
+            return False
+        if 'created_before' in self.filters and log.created_at >= self.filters['created_before']:
+            return False
+        return True
+
+    def _rows(self, segment, after):
+        for log in read_member(segment, self.user.pk):
+            if after is not None and sort_key(log.created_at, log.pk) <= after:
+                continue
+            if self._matches(log):
+                log.user = self.user
+                yield log
+
+    def iterate(self, after=None, until=None):
+        """
+        Yield logs that come after ``after``, a ``(created_at, id)`` pair,
+        stopping at the first log created before ``until``.
+
+        Segments are merged by creation time; each is only decompressed once
+        the merge reaches its newest row.
+        """
+        segments = self.segments()
+        if after is not None:
+            segments = segments.filter(oldest_created_at__lte=after[0])
+            after = sort_key(*after)
+        if until is not None:
+            segments = segments.filter(newest_created_at__gte=until)
+        waiting = deque(segments)
+        heap = []
+        order = itertools.count()
+        while heap or waiting:
+            while waiting and (not heap or sort_key(waiting[0].newest_created_at, float('inf')) <= heap[0][0]):
+                rows = self._rows(waiting.popleft(), after)
+                log = next(rows, None)
+                if log is not None:
+                    heapq.heappush(heap, (sort_key(log.created_at, log.pk), next(order), log, rows))
+            if not heap:
+                continue
+            _, position, log, rows = heapq.heappop(heap)
+            if until is not None and log.created_at < until:
+                return
+            yield log
+            following = next(rows, None)
+            if following is not None:
+                heapq.heappush(heap, (sort_key(following.created_at, following.pk), position, following, rows))
+
+
+def get_archived_log(user, pk):
+    """Return the user's archived log with id ``pk``, or None"""
+    segments = ModerationArchive.objects.filter(
+        Q(min_log_id__lte=pk) & Q(max_log_id__gte=pk), members__has_key=str(user.pk)
+    )
+    for segment in segments:
+        for log in read_member(segment, user.pk):
+            if log.pk == pk:
+                log.user = user
+                return log
+    return None
@@ -0,0 +1,218 @@
+"""
+Native async versions of the moderation, dashboard and health endpoints.
+
+Under ASGI, DRF's synchronous views run one request per thread through the
+sync adapter. These views keep the same URLs, request formats and response
+bodies but await the ORM, the cache and the moderation backend, so one
+worker can interleave many in-flight moderation calls. They are routed in
+place of the DRF views when ``ASYNC_API_VIEWS`` is set.
+"""
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, ParseError, Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+
+from . import verdicts
+from .authentication import CachedJWTAuthentication
+from .cache import ADMIN_SCOPE, aget_or_compute_dashboard
+from .images import image_upload_handlers
+from .jobs import enqueue
+from .models import ModerationLog
+from .rollups import record_moderation
+from .serializers import (
+    LogFormatSerializer, ModerationLogSerializer, ModerationModeSerializer,
+    ModerationRequestSerializer, get_log_serializer_class, sideload_users
+)
+from .stats import aget_rollup_stats
+from .throttling import SlidingWindowRateThrottle
+from .usage import client_ip
+
+authenticator = CachedJWTAuthentication()
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    """Render ``data`` exactly as DRF's JSONRenderer would"""
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+def render_exception(exc):
+    data = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    response = render(data, exc.status_code)
+    if isinstance(exc, (AuthenticationFailed, NotAuthenticated)):
+        response['WWW-Authenticate'] = authenticator.authenticate_header(None)
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+def api_view(throttle_scope=None):
+    """
+    Authenticate the JWT, apply the scope's throttle and turn DRF API
+    exceptions into responses
+    """
+    def decorator(view):
+        async def wrapper(request, *args, **kwargs):
+            try:
+                authenticated = await authenticator.aauthenticate(request)
+                if authenticated is None:
+                    raise NotAuthenticated()
+                request.user = authenticated[0]
+
+                throttle = SlidingWindowRateThrottle()
+                if not await throttle.aallow_request(request, wrapper):
+                    raise Throttled(throttle.wait())
+                return await view(request, *args, **kwargs)
+            except APIException as exc:
+                return render_exception(exc)
+
+        wrapper.__name__ = view.__name__
+        wrapper.__doc__ = view.__doc__
+        wrapper.throttle_scope = throttle_scope
+        return csrf_exempt(wrapper)
+
+    return decorator
+
+
+def validate(serializer):
+    if not serializer.is_valid():
+        return render(serializer.errors, status.HTTP_400_BAD_REQUEST)
+    return None
+
+
+@require_GET
+async def health_check(request):
+    """
+    Health check endpoint
+    """
+    return render({
+        'status': 'healthy',
+        'timestamp': timezone.now(),
+        'version': '1.0.0'
+    })
+
+
+def _request_data(request):
+    """Parse a JSON, form or multipart body the way the DRF view accepts it"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}') from exc
+    # Stream image uploads through the bounded-memory pipeline
+    request.upload_handlers = image_upload_handlers(request)
+    data = request.POST.dict()
+    data.update(request.FILES.dict())
+    return data
+
+
+def _save_finished(moderation_log):
+    with transaction.atomic():
+        moderation_log.save()
+        record_moderation(moderation_log)
+    # The nested user may still have to load the fields the auth cache leaves out
+    return ModerationLogSerializer(moderation_log).data
+
+
+def _save_queued(moderation_log):
+    with transaction.atomic():
+        moderation_log.save()
+        enqueue(moderation_log)
+
+
+@require_POST
+@api_view(throttle_scope='moderate')
+async def content_moderation(request):
+    """
+    Submit content for moderation analysis
+    """
+    start_time = time.time()
+
+    options = ModerationModeSerializer(data=request.GET)
+    if (error := validate(options)) is not None:
+        return error
+
+    data = await sync_to_async(_request_data, thread_sensitive=False)(request)
+    serializer = ModerationRequestSerializer(data=data, context={'request': request})
+    # Image validation decodes the header and hashes the pixels off the event loop
+    await sync_to_async(serializer.is_valid, thread_sensitive=False)()
+    if (error := validate(serializer)) is not None:
+        return error
+
+    moderation_log = ModerationLog(
+        user=request.user,
+        ip_address=client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        **serializer.validated_data
+    )
+
+    if options.validated_data['mode'] == 'async':
+        await sync_to_async(_save_queued)(moderation_log)
+        return render({
+            'id': moderation_log.pk,
+            'result': moderation_log.result,
+            'status_url': reverse('moderation_result', args=[moderation_log.pk], request=request),
+        }, status.HTTP_202_ACCEPTED)
+
+    result_data = await verdicts.amoderate(
+        moderation_log.input_type,
+        moderation_log.input_value,
+        moderation_log.input_file,
+    )
+    for field, value in result_data.items():
+        setattr(moderation_log, field, value)
+    moderation_log.processing_time_ms = int((time.time() - start_time) * 1000)
+
+    # The async ORM has no transactions, so the log and its rollup bucket
+    # are written together in one sync call
+    return render(await sync_to_async(_save_finished)(moderation_log))
+
+
+async def _dashboard_payload(user, user_format):
+    if user.is_admin:
+        stats = await aget_rollup_stats()
+        logs = ModerationLog.objects.all()
+    else:
+        stats = await aget_rollup_stats(user)
+        logs = ModerationLog.objects.filter(user=user)
+    if user_format == 'full':
+        logs = logs.select_related('user')
+
+    recent_logs = [log async for log in logs[:10]]
+    stats['recent_logs'] = get_log_serializer_class(user_format)(recent_logs, many=True).data
+    if user_format == 'sideload':
+        stats['users'] = await sync_to_async(sideload_users)(recent_logs)
+    return stats
+
+
+@require_GET
+@api_view()
+async def dashboard(request):
+    """
+    Get dashboard analytics for the current user or admin aggregated stats
+    """
+    user = request.user
+    params = LogFormatSerializer(data=request.GET)
+    if (error := validate(params)) is not None:
+        return error
+    user_format = params.validated_data['user_format']
+
+    stats, hit = await aget_or_compute_dashboard(
+        ADMIN_SCOPE if user.is_admin else user.pk,
+        user_format,
+        lambda: _dashboard_payload(user, user_format),
+    )
+    if user.is_admin:
+        stats = {**stats, 'verdict_cache': await verdicts.verdict_counter.aget()}
+
+    response = render(stats)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
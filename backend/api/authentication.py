@@ -0,0 +1,205 @@
+"""
+JWT authentication helpers.
+"""
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .lru import LRUCache
+
+# All that authentication and the hot views read from the user
+PRINCIPAL_FIELDS = ('id', 'role', 'is_active', 'is_verified')
+# Claims the tokens carry for JWT_TRUST_ROLE_CLAIM
+PRINCIPAL_CLAIMS = ('role', 'is_verified')
+
+
+@lru_cache(maxsize=None)
+def _local_principals():
+    return LRUCache(settings.JWT_USER_CACHE_SIZE, settings.JWT_USER_CACHE_LOCAL_TTL)
+
+
+@receiver(setting_changed)
+def _reset_local_principals(setting, **kwargs):
+    if setting.startswith('JWT_USER_CACHE'):
+        _local_principals.cache_clear()
+
+
+def _principal_key(user_id):
+    return f'auth:principal:{user_id}'
+
+
+def _principal_query(user_id):
+    return get_user_model().objects.filter(pk=user_id).values_list(*PRINCIPAL_FIELDS)
+
+
+def get_principal(user_id):
+    """
+    Return the ``PRINCIPAL_FIELDS`` values of a user, or None if there is
+    no such user, from this process's LRU, then the shared cache, then the
+    database
+    """
+    user_id = str(user_id)
+    local = _local_principals()
+    principal = local.get(user_id)
+    if principal is None:
+        principal = cache.get(_principal_key(user_id))
+        if principal is None:
+            principal = _principal_query(user_id).first()
+            if principal is None:
+                return None
+            cache.set(_principal_key(user_id), principal, settings.JWT_USER_CACHE_TTL)
+        local.set(user_id, principal)
+    return principal
+
+
+async def aget_principal(user_id):
+    """``get_principal`` through the async cache and ORM"""
+    user_id = str(user_id)
+    local = _local_principals()
+    principal = local.get(user_id)
+    if principal is None:
+        principal = await cache.aget(_principal_key(user_id))
+        if principal is None:
+            principal = await _principal_query(user_id).afirst()
+            if principal is None:
+                return None
+            await cache.aset(_principal_key(user_id), principal, settings.JWT_USER_CACHE_TTL)
+        local.set(user_id, principal)
+    return principal
+
+
+def invalidate_principal(user_id):
+    """
+    Forget a user's cached principal. Other processes keep theirs for up
+    to ``JWT_USER_CACHE_LOCAL_TTL`` seconds.
+    """
+    _local_principals().delete(str(user_id))
+    cache.delete(_principal_key(user_id))
+
+
+def touch_last_login(user):
+    """
+    Record a token login on ``user.last_login`` without a session, writing
+    at most once per ``LAST_LOGIN_UPDATE_INTERVAL`` seconds per user
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.LAST_LOGIN_UPDATE_INTERVAL)
+    if user.last_login is not None and user.last_login >= cutoff:
+        return
+    # Conditional, so concurrent logins write once; update() also leaves the
+    # cached principal alone
+    get_user_model().objects.filter(pk=user.pk).filter(
+        Q(last_login__isnull=True) | Q(last_login__lt=cutoff)
+    ).update(last_login=now)
+    user.last_login = now
+
+
+def principal_user(principal):
+    """
+    Build a user from principal values. Every other field is deferred and
+    loaded from the database on first access.
+    """
+    model = get_user_model()
+    values = dict(zip(PRINCIPAL_FIELDS, principal))
+    # from_db() takes the loaded fields in model order
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` with an awaitable entry point for plain Django
+    async views, loading the user through the async ORM
+    """
+
+    async def aauthenticate(self, request):
+        """Return ``(user, validated_token)``, or None without credentials"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Async ``get_user`` with the same checks"""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code='user_not_found') from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+        return user
+
+
+class CachedJWTAuthentication(AsyncJWTAuthentication):
+    """
+    ``JWTAuthentication`` that reads the user through the principal cache
+    instead of querying ``UserProfile`` on every request.
+
+    ``request.user`` is a ``UserProfile`` with only ``PRINCIPAL_FIELDS``
+    loaded. With ``JWT_TRUST_ROLE_CLAIM`` the role and verification claims
+    in the access token are used as they are, skipping even the cache; a
+    role change or deactivation then shows once the access token is
+    refreshed.
+    """
+
+    def _principal_from_claims(self, validated_token, user_id):
+        if not settings.JWT_TRUST_ROLE_CLAIM or not all(claim in validated_token for claim in PRINCIPAL_CLAIMS):
+            return None
+        # Refreshing checks is_active before it issues these claims
+        return (int(user_id), validated_token['role'], True, validated_token['is_verified'])
+
+    def _user(self, principal):
+        if principal is None:
+            raise AuthenticationFailed("User not found", code='user_not_found')
+        user = principal_user(principal)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+        return user
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+    def get_user(self, validated_token):
+        if not settings.JWT_USER_CACHE_ENABLED or api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares the password hash, which is not cached
+            return super().get_user(validated_token)
+        user_id = self._user_id(validated_token)
+        return self._user(self._principal_from_claims(validated_token, user_id) or get_principal(user_id))
+
+    async def aget_user(self, validated_token):
+        if not settings.JWT_USER_CACHE_ENABLED or api_settings.CHECK_REVOKE_TOKEN:
+            return await super().aget_user(validated_token)
+        user_id = self._user_id(validated_token)
+        return self._user(self._principal_from_claims(validated_token, user_id) or await aget_principal(user_id))
@@ -0,0 +1,254 @@
+"""
+Pluggable content moderation backends.
+
+The active backend is selected with the ``MODERATION_BACKEND`` setting and
+must subclass ``ModerationBackend``.
+"""
+import asyncio
+import random
+import time
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .fetcher import get_fetcher, page_text
+from .matcher import get_matcher
+
+
+def keyword_confidence(count):
+    """Confidence of an unsafe verdict backed by ``count`` keyword flags"""
+    return round(min(0.7 + 0.05 * count, 0.95), 3)
+
+
+class ModerationBackend:
+    """
+    Base class for moderation backends
+    """
+    # Whether identical content may reuse a stored verdict
+    cacheable = True
+
+    @property
+    def version(self):
+        """
+        Identifies the backend and its ruleset. Cached verdicts recorded
+        under another version are never reused.
+        """
+        return f'{type(self).__module__}.{type(self).__qualname__}'
+
+    def moderate(self, input_type, input_value, input_file=None):
+        """
+        Analyse a single item and return a dict with ``result``,
+        ``risk_level``, ``confidence_score`` and ``flags_detected``
+        """
+        raise NotImplementedError('Subclasses must implement moderate()')
+
+    def moderate_many(self, items):
+        """
+        Analyse a sequence of ``(input_type, input_value, input_file)``
+        tuples and return one result dict per item, in order.
+
+        Backends that can batch calls to a remote service should override it.
+        """
+        return [self.moderate(*item) for item in items]
+
+    async def amoderate_many(self, items):
+        """
+        Awaitable ``moderate_many`` for ASGI views. The default runs the
+        synchronous implementation in a worker thread; backends that wait on
+        the network should override it.
+        """
+        return await sync_to_async(self.moderate_many, thread_sensitive=False)(items)
+
+    def normalize(self, input_type, input_value):
+        """
+        Key text and URL verdicts are cached under. Inputs sharing a key
+        reuse one verdict, so only fold what the analysis itself ignores.
+        The default is the input verbatim.
+        """
+        return input_value or ''
+
+    def localize(self, verdict, input_value):
+        """
+        Adapt a verdict reused from equivalent content to this exact input,
+        e.g. to recompute match offsets. Returns the verdict.
+        """
+        return verdict
+
+
+class RuleBasedBackend(ModerationBackend):
+    """
+    Fast deterministic backend driven by the compiled keyword rules
+    """
+
+    @property
+    def version(self):
+        return f'{super().version}:{get_matcher().fingerprint}'
+
+    def normalize(self, input_type, input_value):
+        # The matcher compares folded text and nothing else
+        return get_matcher().fold(input_value or '')
+
+    def _spans_by_keyword(self, input_value):
+        spans_by_keyword = {}
+        for match in get_matcher().scan(input_value or ''):
+            spans_by_keyword.setdefault(match.rule.keyword, []).append([match.start, match.end])
+        return spans_by_keyword
+
+    def moderate(self, input_type, input_value, input_file=None):
+        spans_by_keyword = self._spans_by_keyword(input_value)
+
+        flags_detected = [
+            {
+                'message': f"Contains '{keyword}'",
+                'keyword': keyword,
+                'spans': spans,
+            }
+            for keyword, spans in spans_by_keyword.items()
+        ]
+
+        if flags_detected:
+            return {
+                'result': 'unsafe',
+                'risk_level': 'high',
+                'confidence_score': keyword_confidence(len(flags_detected)),
+                'flags_detected': flags_detected,
+            }
+
+        return {
+            'result': 'safe',
+            'risk_level': 'low',
+            'confidence_score': 0.9,
+            'flags_detected': [],
+        }
+
+    def localize(self, verdict, input_value):
+        if any('spans' in flag for flag in verdict['flags_detected']):
+            spans_by_keyword = self._spans_by_keyword(input_value)
+            for flag in verdict['flags_detected']:
+                if 'spans' in flag:
+                    flag['spans'] = spans_by_keyword.get(flag['keyword'], [])
+        return verdict
+
+
+class PageFetchingBackend(RuleBasedBackend):
+    """
+    Rule backend that also fetches URL targets and scans the page text.
+
+    All URLs in a batch are fetched concurrently through the shared
+    fetcher. Pages that cannot be fetched keep the verdict for the URL
+    string, with a flag and reduced confidence.
+    """
+    # Page content changes and fetches fail transiently; the fetcher keeps
+    # its own short-lived cache of successful responses
+    cacheable = False
+
+    def moderate(self, input_type, input_value, input_file=None):
+        return self.moderate_many([(input_type, input_value, input_file)])[0]
+
+    def moderate_many(self, items):
+        urls = self._urls(items)
+        return self._with_pages(items, get_fetcher().fetch_many(urls) if urls else [])
+
+    async def amoderate_many(self, items):
+        urls = self._urls(items)
+        return self._with_pages(items, await get_fetcher().afetch_many(urls) if urls else [])
+
+    @staticmethod
+    def _urls(items):
+        return [input_value for input_type, input_value, _ in items if input_type == 'url']
+
+    def _with_pages(self, items, pages):
+        pages = iter(pages)
+        results = []
+        for item in items:
+            verdict = super().moderate(*item)
+            if item[0] == 'url':
+                verdict = self._with_page(verdict, next(pages))
+            results.append(verdict)
+        return results
+
+    def _with_page(self, verdict, page):
+        flags = verdict['flags_detected']
+        if page.error:
+            flags.append({'message': f"Page could not be fetched: {page.error}"})
+            verdict['confidence_score'] = min(verdict['confidence_score'], 0.6)
+            return verdict
+
+        if page.redirects and urlsplit(page.final_url).hostname != urlsplit(page.url).hostname:
+            flags.append({
+                'message': "Redirects to another site",
+                'redirects': [url for url, _ in page.redirects] + [page.final_url],
+            })
+
+        seen = {flag['keyword'] for flag in flags if 'keyword' in flag}
+        for match in get_matcher().scan(page_text(page)):
+            keyword = match.rule.keyword
+            if keyword not in seen:
+                seen.add(keyword)
+                flags.append({'message': f"Page contains '{keyword}'", 'keyword': keyword, 'url': page.final_url})
+
+        if seen:
+            verdict.update(result='unsafe', risk_level='high', confidence_score=keyword_confidence(len(seen)))
+        return verdict
+
+
+class SimulatedLatencyBackend(RuleBasedBackend):
+    """
+    Demo backend that imitates a remote AI service.
+
+    Sleeps for a random delay from ``MODERATION_SIMULATED_LATENCY_MS`` and
+    randomly flags a share of clean content. The synchronous path blocks
+    the calling worker, so never enable it in production.
+    """
+    cacheable = False
+
+    @staticmethod
+    def _delay():
+        low, high = settings.MODERATION_SIMULATED_LATENCY_MS
+        return random.uniform(low, high) / 1000
+
+    def moderate(self, input_type, input_value, input_file=None):
+        time.sleep(self._delay())
+        return self._randomize(super().moderate(input_type, input_value, input_file))
+
+    async def amoderate_many(self, items):
+        # Simulated round trips overlap instead of blocking the event loop
+        async def moderate(item):
+            await asyncio.sleep(self._delay())
+            return self._randomize(RuleBasedBackend.moderate(self, *item))
+
+        return await asyncio.gather(*(moderate(item) for item in items))
+
+    def _randomize(self, result_data):
+        if result_data['flags_detected']:
+            result_data['confidence_score'] = random.uniform(0.7, 0.95)
+        else:
+            result_data['confidence_score'] = random.uniform(0.85, 0.99)
+
+        # Add some randomness for demo purposes
+        if random.random() < 0.1:  # 10% chance of unsafe even if no keywords
+            result_data['result'] = 'unsafe'
+            result_data['risk_level'] = random.choice(['medium', 'high'])
+            result_data['flags_detected'].append({'message': "Suspicious patterns detected"})
+            result_data['confidence_score'] = random.uniform(0.6, 0.8)
+
+        result_data['confidence_score'] = round(result_data['confidence_score'], 3)
+        return result_data
+
+
+@lru_cache(maxsize=None)
+def get_moderation_backend():
+    """Return the configured moderation backend instance"""
+    backend_class = import_string(settings.MODERATION_BACKEND)
+    return backend_class()
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    if setting.startswith('MODERATION_'):
+        get_moderation_backend.cache_clear()
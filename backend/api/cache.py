@@ -0,0 +1,111 @@
+"""
+Caching of DashboardView payloads.
+
+Payloads are stored per user plus one global entry for admins. Saving or
+deleting a ModerationLog drops the owner's entry and the admin entry;
+``DASHBOARD_CACHE_TTL`` bounds staleness for writes that bypass signals.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .serializers import USER_FORMATS
+
+ADMIN_SCOPE = 'admin'
+
+
+class HitCounter:
+    """
+    Hit/miss counters kept in the shared cache so every worker reports
+    into the same totals
+    """
+
+    def __init__(self, name):
+        self.keys = {
+            True: f'{name}:counter:hits',
+            False: f'{name}:counter:misses',
+        }
+
+    def record(self, hit, count=1):
+        if not count:
+            return
+        key = self.keys[hit]
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            # First event since the counters were cleared or evicted
+            if not cache.add(key, count, None):
+                cache.incr(key, count)
+
+    async def arecord(self, hit, count=1):
+        if not count:
+            return
+        key = self.keys[hit]
+        try:
+            await cache.aincr(key, count)
+        except ValueError:
+            if not await cache.aadd(key, count, None):
+                await cache.aincr(key, count)
+
+    def get(self):
+        return self._summarize(cache.get_many(self.keys.values()))
+
+    async def aget(self):
+        return self._summarize(await cache.aget_many(self.keys.values()))
+
+    def _summarize(self, counters):
+        hits = counters.get(self.keys[True], 0)
+        misses = counters.get(self.keys[False], 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total * 100, 2) if total else 0,
+        }
+
+
+dashboard_counter = HitCounter('dashboard')
+
+
+def dashboard_cache_key(scope, user_format='full'):
+    return f'dashboard:payload:{scope}:{user_format}'
+
+
+def get_or_compute_dashboard(scope, user_format, compute):
+    """
+    Return ``(payload, hit)`` for ``scope`` (a user id or ``ADMIN_SCOPE``)
+    rendered with ``user_format``, computing and storing it on a miss
+    """
+    key = dashboard_cache_key(scope, user_format)
+    payload = cache.get(key)
+    hit = payload is not None
+    if not hit:
+        payload = compute()
+        cache.set(key, payload, settings.DASHBOARD_CACHE_TTL)
+    dashboard_counter.record(hit)
+    return payload, hit
+
+
+async def aget_or_compute_dashboard(scope, user_format, compute):
+    """Async ``get_or_compute_dashboard``; ``compute`` is a coroutine function"""
+    key = dashboard_cache_key(scope, user_format)
+    payload = await cache.aget(key)
+    hit = payload is not None
+    if not hit:
+        payload = await compute()
+        await cache.aset(key, payload, settings.DASHBOARD_CACHE_TTL)
+    await dashboard_counter.arecord(hit)
+    return payload, hit
+
+
+def invalidate_dashboard(user_ids):
+    """Drop the cached payloads of ``user_ids`` and the admin payload"""
+    scopes = set(user_ids) | {ADMIN_SCOPE}
+    cache.delete_many([
+        dashboard_cache_key(scope, user_format)
+        for scope in scopes
+        for user_format, _ in USER_FORMATS
+    ])
+
+
+def get_cache_counters():
+    return dashboard_counter.get()
@@ -0,0 +1,417 @@
+"""
+Concurrent HTTP fetcher for URL moderation.
+
+Pages are fetched by a minimal HTTP/1.1 client on asyncio streams running
+in one background event loop per process, so every request shares the same
+keep-alive connection pool. Concurrency is bounded globally and per host,
+every fetch has a hard deadline covering all redirects, bodies are read up
+to ``MODERATION_FETCH_MAX_BYTES`` and responses are cached by canonical URL.
+
+Addresses that resolve to private, loopback or otherwise non-public networks
+are refused unless ``MODERATION_FETCH_ALLOW_PRIVATE`` is set.
+"""
+import asyncio
+import ipaddress
+import os
+import socket
+import ssl
+import threading
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .lru import LRUCache
+
+TRACKING_PARAMS = {'fbclid', 'gclid', 'igshid', 'mc_cid', 'mc_eid'}
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Header lines longer than this abort the response
+MAX_LINE_BYTES = 64 * 1024
+
+
+def _authority(host, port=None):
+    """``host[:port]`` with IPv6 literals bracketed and no userinfo"""
+    if ':' in host:
+        host = f'[{host}]'
+    return f'{host}:{port}' if port else host
+
+
+def canonicalize_url(value):
+    """
+    Lower-case scheme and host, drop default ports, fragments and tracking
+    parameters, and sort the query string
+    """
+    value = (value or '').strip()
+    if '://' not in value:
+        value = f'http://{value}'
+    parts = urlsplit(value)
+    scheme = parts.scheme.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port == DEFAULT_PORTS.get(scheme):
+        port = None
+    netloc = _authority((parts.hostname or '').lower(), port)
+    query = sorted(
+        (key, val) for key, val in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(query), ''))
+
+
+class FetchError(Exception):
+    pass
+
+
+class FetchResult(NamedTuple):
+    """Outcome of fetching one URL, following redirects"""
+    url: str
+    final_url: str
+    status: int = None
+    content_type: str = ''
+    body: bytes = b''
+    # (url, status) for each redirect followed, in order
+    redirects: tuple = ()
+    truncated: bool = False
+    error: str = None
+
+
+class _Response(NamedTuple):
+    status: int
+    headers: dict
+    body: bytes
+    truncated: bool
+    reusable: bool
+
+
+class _HostPool:
+    """Idle keep-alive connections and the concurrency limit for one host"""
+
+    def __init__(self, limit):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle = []
+
+
+class Fetcher:
+    """
+    Fetch many URLs concurrently from synchronous or asynchronous code.
+
+    The event loop, pools and response cache live as long as the fetcher;
+    use ``get_fetcher()`` for the process-wide instance.
+    """
+
+    def __init__(self, max_connections=100, per_host=8, timeout=10.0, max_bytes=1024 * 1024,
+                 max_redirects=5, cache_size=10000, cache_ttl=300, allow_private=False,
+                 user_agent='BrandSafeGuardian/1.0'):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_redirects = max_redirects
+        self.allow_private = allow_private
+        self.user_agent = user_agent
+        self.cache = LRUCache(cache_size, cache_ttl)
+        self.connections_opened = 0
+
+        self._hosts = {}
+        self._inflight = {}
+        self._ssl_context = ssl.create_default_context()
+        self._loop = asyncio.new_event_loop()
+        self._slots = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name='url-fetcher', daemon=True)
+        self._thread.start()
+
+    def fetch_many(self, urls):
+        """Fetch ``urls`` concurrently and return one FetchResult per URL, in order"""
+        return asyncio.run_coroutine_threadsafe(self._fetch_many(urls), self._loop).result()
+
+    async def afetch_many(self, urls):
+        """Awaitable ``fetch_many`` for code running in another event loop"""
+        future = asyncio.run_coroutine_threadsafe(self._fetch_many(urls), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        async def close_connections():
+            for pool in self._hosts.values():
+                for _, writer in pool.idle:
+                    writer.close()
+            self._hosts.clear()
+
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(close_connections(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+        self._loop.close()
+
+    async def _fetch_many(self, urls):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        return await asyncio.gather(*(self._fetch_cached(url) for url in urls))
+
+    async def _fetch_cached(self, url):
+        key = canonicalize_url(url)
+        result = self.cache.get(key)
+        if result is None:
+            # Concurrent requests for the same page share one fetch
+            task = self._inflight.get(key)
+            if task is None:
+                task = self._inflight[key] = asyncio.ensure_future(self._fetch(key))
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            result = await asyncio.shield(task)
+        return result._replace(url=url)
+
+    async def _fetch(self, key):
+        url = key
+        redirects = []
+        try:
+            async with asyncio.timeout(self.timeout):
+                while True:
+                    response = await self._request(url)
+                    location = response.headers.get('location')
+                    if response.status not in REDIRECT_STATUSES or not location:
+                        break
+                    if len(redirects) == self.max_redirects:
+                        raise FetchError('too many redirects')
+                    redirects.append((url, response.status))
+                    url = urljoin(url, location)
+        except TimeoutError:
+            return FetchResult(url, url, redirects=tuple(redirects), error='timeout')
+        except (FetchError, OSError, EOFError, ValueError) as exc:
+            return FetchResult(url, url, redirects=tuple(redirects), error=str(exc) or type(exc).__name__)
+
+        result = FetchResult(
+            url=url,
+            final_url=url,
+            status=response.status,
+            content_type=response.headers.get('content-type', ''),
+            body=response.body,
+            redirects=tuple(redirects),
+            truncated=response.truncated,
+        )
+        # Only successful pages are cached so the next request retries failures
+        if 200 <= response.status < 300:
+            self.cache.set(key, result)
+        return result
+
+    async def _request(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in DEFAULT_PORTS or not parts.hostname:
+            raise FetchError(f'unsupported URL: {url}')
+        host = parts.hostname
+        port = parts.port or DEFAULT_PORTS[parts.scheme]
+        pool = self._hosts.get((parts.scheme, host, port))
+        if pool is None:
+            pool = self._hosts[(parts.scheme, host, port)] = _HostPool(self.per_host)
+
+        # Wait for the host first so one busy host cannot hold every global slot
+        async with pool.semaphore, self._slots:
+            while pool.idle:
+                reader, writer = pool.idle.pop()
+                if reader.at_eof() or writer.is_closing():
+                    writer.close()
+                    continue
+                try:
+                    return await self._roundtrip(pool, reader, writer, parts)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # The server closed the idle connection; open a new one
+                    continue
+            reader, writer = await self._connect(parts.scheme, host, port)
+            return await self._roundtrip(pool, reader, writer, parts)
+
+    async def _connect(self, scheme, host, port):
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        if not infos:
+            raise FetchError(f'cannot resolve {host}')
+        address = infos[0][4][0]
+        if not self.allow_private and not ipaddress.ip_address(address).is_global:
+            raise FetchError(f'{host} resolves to a non-public address')
+
+        # Connect to the checked address so a second lookup cannot swap it
+        secure = scheme == 'https'
+        self.connections_opened += 1
+        return await asyncio.open_connection(
+            address, port,
+            ssl=self._ssl_context if secure else None,
+            server_hostname=host if secure else None,
+            limit=MAX_LINE_BYTES,
+        )
+
+    async def _roundtrip(self, pool, reader, writer, parts):
+        try:
+            response = await self._exchange(reader, writer, parts)
+        except BaseException:
+            writer.close()
+            raise
+        if response.reusable and len(pool.idle) < self.per_host:
+            pool.idle.append((reader, writer))
+        else:
+            writer.close()
+        return response
+
+    async def _exchange(self, reader, writer, parts):
+        target = parts.path or '/'
+        if parts.query:
+            target = f'{target}?{parts.query}'
+        writer.write((
+            f'GET {target} HTTP/1.1\r\n'
+            f'Host: {_authority(parts.hostname, parts.port)}\r\n'
+            f'User-Agent: {self.user_agent}\r\n'
+            'Accept: text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.1\r\n'
+            'Accept-Encoding: identity\r\n'
+            'Connection: keep-alive\r\n'
+            '\r\n'
+        ).encode('latin-1'))
+        await writer.drain()
+
+        # Interim 1xx responses (100 Continue, 103 Early Hints) precede the
+        # final one on the same connection
+        while True:
+            version, status, headers = await self._read_head(reader)
+            if not 100 <= status < 200 or status == 101:
+                break
+
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if status == 101:
+            # The server switched protocols; the connection is no longer HTTP
+            return _Response(status, headers, b'', False, False)
+        if status in (204, 304):
+            return _Response(status, headers, b'', False, keep_alive)
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            body, truncated = await self._read_chunked(reader)
+        elif 'content-length' in headers:
+            length = int(headers['content-length'])
+            body = await reader.readexactly(min(length, self.max_bytes))
+            truncated = length > self.max_bytes
+        else:
+            body, truncated = await self._read_to_eof(reader)
+            keep_alive = False
+        return _Response(status, headers, body, truncated, keep_alive and not truncated)
+
+    async def _read_head(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b'', None)
+        try:
+            version, status = status_line.decode('latin-1').split(None, 2)[:2]
+            status = int(status)
+        except ValueError:
+            raise FetchError('malformed status line')
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return version, status, headers
+
+    async def _read_to_eof(self, reader):
+        chunks = []
+        received = 0
+        while received < self.max_bytes:
+            chunk = await reader.read(self.max_bytes - received)
+            if not chunk:
+                return b''.join(chunks), False
+            chunks.append(chunk)
+            received += len(chunk)
+        return b''.join(chunks), bool(await reader.read(1))
+
+    async def _read_chunked(self, reader):
+        chunks = []
+        received = 0
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                # Skip trailers
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks), False
+            if received + size > self.max_bytes:
+                chunks.append(await reader.readexactly(self.max_bytes - received))
+                return b''.join(chunks), True
+            chunks.append(await reader.readexactly(size))
+            received += size
+            await reader.readexactly(2)
+
+
+class _TextExtractor(HTMLParser):
+    SKIPPED_TAGS = {'script', 'style', 'noscript', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag == 'meta':
+            attrs = dict(attrs)
+            if attrs.get('name', '').lower() in ('description', 'keywords') and attrs.get('content'):
+                self.parts.append(attrs['content'])
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def page_text(result):
+    """Visible text, title and meta description of a fetched page"""
+    if result.error or not result.body:
+        return ''
+    content_type = result.content_type.lower()
+    charset = 'utf-8'
+    if 'charset=' in content_type:
+        charset = content_type.split('charset=', 1)[1].split(';')[0].strip(' "\'')
+    try:
+        text = result.body.decode(charset, errors='replace')
+    except LookupError:
+        text = result.body.decode('utf-8', errors='replace')
+
+    if 'html' in content_type:
+        extractor = _TextExtractor()
+        extractor.feed(text)
+        extractor.close()
+        return ' '.join(extractor.parts)
+    if content_type.startswith('text/'):
+        return text
+    return ''
+
+
+@lru_cache(maxsize=None)
+def get_fetcher():
+    """Return the process-wide fetcher, starting its event loop on first use"""
+    return Fetcher(
+        max_connections=settings.MODERATION_FETCH_MAX_CONNECTIONS,
+        per_host=settings.MODERATION_FETCH_PER_HOST,
+        timeout=settings.MODERATION_FETCH_TIMEOUT,
+        max_bytes=settings.MODERATION_FETCH_MAX_BYTES,
+        max_redirects=settings.MODERATION_FETCH_MAX_REDIRECTS,
+        cache_size=settings.MODERATION_FETCH_CACHE_SIZE,
+        cache_ttl=settings.MODERATION_FETCH_CACHE_TTL,
+        allow_private=settings.MODERATION_FETCH_ALLOW_PRIVATE,
+        user_agent=settings.MODERATION_FETCH_USER_AGENT,
+    )
+
+
+@receiver(setting_changed)
+def _reset_fetcher(setting, **kwargs):
+    if setting.startswith('MODERATION_FETCH_') and get_fetcher.cache_info().currsize:
+        get_fetcher().close()
+        get_fetcher.cache_clear()
+
+
+# A forked worker process cannot use its parent's event loop thread
+os.register_at_fork(after_in_child=get_fetcher.cache_clear)
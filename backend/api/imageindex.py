@@ -0,0 +1,235 @@
+"""
+In-memory index of perceptual hashes for near-duplicate image detection.
+
+Counterfeit listings reuse product photos with small crops and
+recompression, which changes the bytes but barely moves the 64-bit dHash.
+Hashes of images already judged unsafe are kept in a multi-index hash
+table, so a new upload within ``MODERATION_PHASH_MAX_DISTANCE`` bits of one
+of them reuses that verdict instead of being moderated again.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
+from itertools import combinations
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError, connections
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .images import hash_image_file
+from .models import ModerationLog
+
+logger = logging.getLogger(__name__)
+
+BLOCKS = 4
+BLOCK_BITS = 64 // BLOCKS
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(radius):
+    """Every BLOCK_BITS-bit mask with at most ``radius`` bits set"""
+    return [
+        sum(1 << bit for bit in bits)
+        for flips in range(radius + 1)
+        for bits in combinations(range(BLOCK_BITS), flips)
+    ]
+
+
+class MultiIndexHash:
+    """
+    Multi-index hash table over 64-bit hashes under Hamming distance.
+
+    Each hash is split into ``BLOCKS`` blocks and filed under every block
+    value. Two hashes within ``r`` bits must agree to within ``r // BLOCKS``
+    bits on at least one block (pigeonhole), so a search only probes the
+    neighbours of the query's blocks and checks the few hashes found there.
+    """
+
+    def __init__(self):
+        self._tables = [{} for _ in range(BLOCKS)]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _blocks(key):
+        return [(key >> (index * BLOCK_BITS)) & BLOCK_MASK for index in range(BLOCKS)]
+
+    def add(self, key, value):
+        entry = (key, value)
+        for table, block in zip(self._tables, self._blocks(key)):
+            table.setdefault(block, []).append(entry)
+        self._size += 1
+
+    def search(self, key, radius):
+        """Return ``(distance, value)`` pairs within ``radius``, nearest first"""
+        masks = _flip_masks(radius // BLOCKS)
+        seen = set()
+        found = []
+        for table, block in zip(self._tables, self._blocks(key)):
+            for mask in masks:
+                for entry in table.get(block ^ mask, ()):
+                    if entry in seen:
+                        continue
+                    seen.add(entry)
+                    distance = hamming(key, entry[0])
+                    if distance <= radius:
+                        found.append((distance, entry[1]))
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class ImageIndex:
+    """
+    Perceptual hashes of unsafe image logs with their verdicts.
+
+    Loaded from the database on first use, then kept current by the
+    ModerationLog signal in this process and by catching up on rows changed
+    elsewhere (e.g. by worker processes) every
+    ``MODERATION_PHASH_INDEX_REFRESH`` seconds. Logs that stop being unsafe
+    are dropped from ``entries``; their table slots are skipped on lookup
+    and reused if they become unsafe again.
+    """
+
+    def __init__(self):
+        self.table = MultiIndexHash()
+        self.entries = {}
+        self._indexed = set()
+        self._lock = threading.Lock()
+        self._synced_at = None
+        self._next_refresh = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, log_id, perceptual_hash, verdict):
+        """Index ``log_id`` if ``verdict`` is unsafe, otherwise forget it"""
+        with self._lock:
+            self._update(log_id, perceptual_hash, verdict)
+
+    def _update(self, log_id, perceptual_hash, verdict):
+        if not perceptual_hash or verdict.get('result') != 'unsafe':
+            self.entries.pop(log_id, None)
+            return
+        if log_id not in self._indexed:
+            self._indexed.add(log_id)
+            self.table.add(int(perceptual_hash, 16), log_id)
+        self.entries[log_id] = verdict
+
+    def refresh(self):
+        """Load or catch up on unsafe image logs changed since the last sync"""
+        now = timezone.now()
+        logs = ModerationLog.objects.filter(input_type='image', perceptual_hash__isnull=False)
+        if self._synced_at is None:
+            logs = logs.filter(result='unsafe')
+        else:
+            # Overlap slightly so rows committed out of order are not missed
+            logs = logs.filter(updated_at__gte=self._synced_at - timedelta(seconds=1))
+
+        with self._lock:
+            for log_id, perceptual_hash, risk_level, confidence_score, result in logs.values_list(
+                'id', 'perceptual_hash', 'risk_level', 'confidence_score', 'result'
+            ).iterator():
+                self._update(log_id, perceptual_hash, {
+                    'result': result, 'risk_level': risk_level, 'confidence_score': confidence_score,
+                })
+            self._synced_at = now
+            self._next_refresh = time.monotonic() + settings.MODERATION_PHASH_INDEX_REFRESH
+
+    def nearest(self, perceptual_hash):
+        """Return ``(log_id, distance, verdict)`` for the closest unsafe match, or None"""
+        if time.monotonic() >= self._next_refresh:
+            self.refresh()
+        with self._lock:
+            matches = self.table.search(int(perceptual_hash, 16), settings.MODERATION_PHASH_MAX_DISTANCE)
+            for distance, log_id in matches:
+                verdict = self.entries.get(log_id)
+                if verdict is not None:
+                    return log_id, distance, verdict
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_image_index():
+    """Return the process-wide index, loading it on first use"""
+    index = ImageIndex()
+    index.refresh()
+    return index
+
+
+def warm_image_index():
+    """
+    Load the index before the first image upload needs it. Called by the
+    WSGI and ASGI entry points rather than ``AppConfig.ready()``, so
+    migrations and management commands never scan the logs.
+    """
+    if not settings.MODERATION_PHASH_ENABLED:
+        return
+    try:
+        get_image_index()
+    except DatabaseError:
+        # Not migrated yet; the first lookup loads it instead
+        logger.warning("Near-duplicate image index not loaded at startup", exc_info=True)
+    finally:
+        # Requests run on their own connections, and a forking server must
+        # not share this one with its workers
+        connections.close_all()
+
+
+@receiver(setting_changed)
+def _reset_image_index(setting, **kwargs):
+    if setting.startswith('MODERATION_PHASH_'):
+        get_image_index.cache_clear()
+
+
+def item_perceptual_hash(input_type, input_file):
+    """Perceptual hash of an image item, reusing the one taken on upload"""
+    if input_type != 'image' or not input_file:
+        return None
+    perceptual_hash = getattr(input_file, 'perceptual_hash', None)
+    if perceptual_hash is None:
+        try:
+            input_file.seek(0)
+            _, perceptual_hash = hash_image_file(input_file)
+        except (OSError, SyntaxError):
+            return None
+        finally:
+            input_file.seek(0)
+    return perceptual_hash
+
+
+def near_duplicate_verdict(input_type, input_value, input_file=None):
+    """
+    Verdict of a known-unsafe image within the distance threshold of this
+    item, or None when there is no such image or the index is disabled
+    """
+    if not settings.MODERATION_PHASH_ENABLED:
+        return None
+    perceptual_hash = item_perceptual_hash(input_type, input_file)
+    if perceptual_hash is None:
+        return None
+    match = get_image_index().nearest(perceptual_hash)
+    if match is None:
+        return None
+
+    log_id, distance, verdict = match
+    return {
+        'result': 'unsafe',
+        'risk_level': verdict['risk_level'],
+        'confidence_score': verdict['confidence_score'],
+        'flags_detected': [{
+            'message': "Near-duplicate of a known unsafe image",
+            'matched_log': log_id,
+            'distance': distance,
+        }],
+    }
@@ -0,0 +1,153 @@
+"""
+Streaming upload pipeline for image moderation.
+
+``ImageUploadHandler`` replaces Django's default upload handlers on the
+moderation endpoint. Uploads are spooled to a temporary file in fixed-size
+chunks while their SHA-256 digest is computed, the header is checked
+against the size, pixel and format limits as soon as it arrives, and a
+perceptual hash is taken from a downscaled decode once the file is complete.
+Oversized or unsupported uploads are rejected before the rest of the body
+is read.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, UnidentifiedImageError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+IMAGE_FIELD = 'input_file'
+CHUNK_SIZE = 64 * 1024
+# Bytes of an upload buffered while waiting for a parseable image header
+HEADER_BYTES = 256 * 1024
+# Allowance for the multipart framing and the other form fields
+MULTIPART_OVERHEAD = 64 * 1024
+# dHash compares HASH_SIZE + 1 columns per row, giving a 64-bit hash
+HASH_SIZE = 8
+
+
+class ImageRejected(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "The uploaded image is not supported."
+    default_code = 'invalid_image'
+
+
+class ImageTooLarge(ImageRejected):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "The uploaded image is too large."
+    default_code = 'image_too_large'
+
+
+def check_dimensions(image):
+    """Validate the format and pixel count from an opened (undecoded) image"""
+    if image.format not in settings.MODERATION_IMAGE_FORMATS:
+        raise ImageRejected(f"Unsupported image format: {image.format}.")
+    width, height = image.size
+    if width * height > settings.MODERATION_IMAGE_MAX_PIXELS:
+        raise ImageTooLarge(
+            f"Image is {width}x{height}; at most {settings.MODERATION_IMAGE_MAX_PIXELS} pixels are allowed."
+        )
+
+
+def preview(image, size):
+    """
+    Downscale an opened image in place to about ``size`` pixels on the long
+    side. JPEGs are scaled by the decoder itself (draft mode), so the
+    full-resolution bitmap is never held in memory.
+    """
+    image.draft('RGB', (size, size))
+    image.thumbnail((size, size), reducing_gap=2.0)
+    return image
+
+
+def perceptual_hash(image):
+    """64-bit difference hash (dHash) of ``image`` as 16 hex digits"""
+    gray = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = gray.tobytes()
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f'{bits:016x}'
+
+
+def hash_image_file(fp):
+    """Return the pixel size and perceptual hash of an image path or file"""
+    with Image.open(fp) as image:
+        return image.size, perceptual_hash(preview(image, HASH_SIZE * 32))
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Spool the image field to disk in ``CHUNK_SIZE`` pieces, rejecting it as
+    soon as a limit is exceeded. The returned file carries ``sha256``,
+    ``image_size`` and ``perceptual_hash`` attributes.
+    """
+    chunk_size = CHUNK_SIZE
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # A declared body larger than the limit is refused before reading it
+        if content_length > settings.MODERATION_IMAGE_MAX_BYTES + MULTIPART_OVERHEAD:
+            raise ImageTooLarge()
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.is_image = field_name == IMAGE_FIELD
+        self.digest = hashlib.sha256()
+        self.header = bytearray()
+        self.header_checked = False
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.is_image:
+            self.received += len(raw_data)
+            if self.received > settings.MODERATION_IMAGE_MAX_BYTES:
+                self._reject(ImageTooLarge())
+            self.digest.update(raw_data)
+            if not self.header_checked:
+                self.header += raw_data[:HEADER_BYTES - len(self.header)]
+                self._check_header(final=len(self.header) >= HEADER_BYTES)
+        return super().receive_data_chunk(raw_data, start)
+
+    def _check_header(self, final):
+        try:
+            image = Image.open(BytesIO(self.header))
+        except Image.DecompressionBombError:
+            self._reject(ImageTooLarge())
+        except (UnidentifiedImageError, OSError, SyntaxError):
+            if final:
+                self._reject(ImageRejected("The uploaded file is not a valid image."))
+            return
+        try:
+            check_dimensions(image)
+        except ImageRejected as exc:
+            self._reject(exc)
+        self.header_checked = True
+        self.header = None
+
+    def _reject(self, exc):
+        # Closing the spool file deletes it
+        self.file.close()
+        raise exc
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if not self.is_image or uploaded is None:
+            return uploaded
+
+        if not self.header_checked:
+            self._check_header(final=True)
+        try:
+            uploaded.image_size, uploaded.perceptual_hash = hash_image_file(uploaded.temporary_file_path())
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            self._reject(ImageRejected("The uploaded image could not be decoded."))
+        uploaded.sha256 = self.digest.hexdigest()
+        return uploaded
+
+
+def image_upload_handlers(request):
+    """Upload handlers for endpoints that accept moderation images"""
+    return [ImageUploadHandler(request)]
@@ -0,0 +1,152 @@
+"""
+Database-backed queue for asynchronous moderation.
+
+``enqueue`` stores a pending ModerationLog together with a ModerationJob;
+worker processes started by ``run_moderation_workers`` claim jobs under a
+lease, run the moderation backend and write the verdict back. No external
+broker is needed.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import verdicts
+from .cache import invalidate_dashboard
+from .models import ModerationJob
+from .rollups import record_moderation
+
+logger = logging.getLogger(__name__)
+
+VERDICT_FIELDS = ['result', 'risk_level', 'confidence_score', 'flags_detected', 'processing_time_ms']
+
+
+def enqueue(moderation_log):
+    """Queue a saved, pending moderation log for the workers"""
+    job = ModerationJob.objects.create(moderation_log=moderation_log)
+    record_moderation(moderation_log)
+    invalidate_dashboard([moderation_log.user_id])
+    return job
+
+
+def _claimable(now):
+    return Q(status='queued') | Q(status='running', lease_expires_at__lt=now)
+
+
+def claim_jobs(limit):
+    """
+    Claim up to ``limit`` queued jobs, or running jobs whose lease expired.
+
+    Each claim is a conditional UPDATE, so concurrent workers never run the
+    same job twice on any database backend.
+    """
+    now = timezone.now()
+    lease_expires_at = now + timedelta(seconds=settings.MODERATION_JOB_LEASE_SECONDS)
+    candidates = (
+        ModerationJob.objects.filter(_claimable(now))
+        .order_by('created_at')
+        .values_list('id', flat=True)[:limit]
+    )
+
+    claimed = [
+        job_id for job_id in candidates
+        if ModerationJob.objects.filter(_claimable(now), id=job_id).update(
+            status='running',
+            lease_expires_at=lease_expires_at,
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+    ]
+    return list(ModerationJob.objects.filter(id__in=claimed).select_related('moderation_log'))
+
+
+def _release(job, status):
+    """
+    Set the status of a job this worker still holds. Returns False if the
+    lease expired and another worker has claimed the job since.
+    """
+    released = ModerationJob.objects.filter(pk=job.pk, status='running', attempts=job.attempts).update(
+        status=status,
+        lease_expires_at=None,
+        last_error=job.last_error,
+        updated_at=timezone.now(),
+    )
+    if not released:
+        logger.warning("Moderation job %s was reclaimed by another worker; discarding this run", job.pk)
+        return False
+    job.status = status
+    job.lease_expires_at = None
+    return True
+
+
+def _finish(job, moderation_log, verdict, status):
+    with transaction.atomic():
+        if not _release(job, status):
+            return
+        # Move the log out of the pending rollup bucket into its final one
+        record_moderation(moderation_log, count=-1)
+        for field, value in verdict.items():
+            setattr(moderation_log, field, value)
+        record_moderation(moderation_log)
+        moderation_log.save(update_fields=VERDICT_FIELDS + ['updated_at'])
+
+
+def run_job(job):
+    """Moderate the job's log and store the verdict"""
+    moderation_log = job.moderation_log
+    start_time = time.time()
+    try:
+        verdict = verdicts.moderate(
+            moderation_log.input_type,
+            moderation_log.input_value,
+            moderation_log.input_file,
+        )
+    except Exception as exc:
+        logger.exception("Moderation job %s failed", job.pk)
+        job.last_error = repr(exc)
+        if job.attempts < settings.MODERATION_JOB_MAX_ATTEMPTS:
+            _release(job, 'queued')
+            return
+        verdict = {'result': 'error', 'risk_level': None, 'confidence_score': None, 'flags_detected': []}
+        verdict['processing_time_ms'] = int((time.time() - start_time) * 1000)
+        _finish(job, moderation_log, verdict, 'failed')
+        return
+
+    verdict['processing_time_ms'] = int((time.time() - start_time) * 1000)
+    job.last_error = None
+    _finish(job, moderation_log, verdict, 'done')
+
+
+def process_pending_jobs(batch_size=10):
+    """Drain the queue in the current process and return the jobs run"""
+    processed = 0
+    while True:
+        jobs = claim_jobs(batch_size)
+        if not jobs:
+            return processed
+        for job in jobs:
+            run_job(job)
+        processed += len(jobs)
+
+
+def run_worker(stop_event, batch_size=10, poll_interval=1.0):
+    """Worker loop: claim and run jobs until ``stop_event`` is set"""
+    while not stop_event.is_set():
+        close_old_connections()
+        try:
+            jobs = claim_jobs(batch_size)
+        except Exception:
+            logger.exception("Could not claim moderation jobs")
+            jobs = []
+        for job in jobs:
+            try:
+                run_job(job)
+            except Exception:
+                # The job stays leased and is claimed again once the lease expires
+                logger.exception("Moderation job %s could not be finished", job.pk)
+        if not jobs:
+            stop_event.wait(poll_interval)
@@ -0,0 +1,62 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from api.archive import archivable_logs, archive_logs
+
+
+class Command(BaseCommand):
+    help = "Move finished moderation logs past the retention window into compressed monthly archives"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=settings.MODERATION_ARCHIVE_AFTER_DAYS,
+            help="Archive logs created more than N days ago (default: MODERATION_ARCHIVE_AFTER_DAYS)"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Rows fetched per database round trip"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report how many logs each month would archive"
+        )
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 1:
+            raise CommandError("--older-than must be at least 1 day")
+
+        # Archive whole days so the rollup reconciler can skip them cleanly
+        cutoff_day = timezone.localdate() - timedelta(days=options['older_than'])
+        cutoff = timezone.make_aware(datetime.combine(cutoff_day, time.min))
+
+        if options['dry_run']:
+            months = (
+                archivable_logs(cutoff)
+                .annotate(month=TruncMonth('created_at'))
+                .order_by('month')
+                .values('month')
+                .annotate(count=Count('id'))
+            )
+            total = 0
+            for month in months:
+                self.stdout.write(f"{month['month']:%Y-%m}: {month['count']} logs")
+                total += month['count']
+            self.stdout.write(f"Would archive {total} logs created before {cutoff_day}.")
+            return
+
+        segments = archive_logs(cutoff, batch_size=options['batch_size'])
+        for segment in segments:
+            self.stdout.write(f"{segment.month:%Y-%m}: {segment.row_count} logs -> {segment.path}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {sum(segment.row_count for segment in segments)} logs created before {cutoff_day}."
+        ))
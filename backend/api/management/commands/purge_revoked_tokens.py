@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.models import RevokedToken
+from api.revocation import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete revoked refresh tokens that have expired; run it daily"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help="Rows deleted per statement"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report how many revoked tokens would be deleted"
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        if options['dry_run']:
+            expired = RevokedToken.objects.filter(expires_at__lte=timezone.now()).count()
+            self.stdout.write(f"Would delete {expired} revoked tokens.")
+            return
+
+        deleted = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} revoked tokens."))
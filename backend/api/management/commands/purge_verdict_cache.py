@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from api.backends import get_moderation_backend
+from api.models import VerdictCacheEntry
+from api.verdicts import ruleset_version
+
+
+class Command(BaseCommand):
+    help = "Delete expired verdict cache entries and those from other ruleset versions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-other-versions',
+            action='store_true',
+            help="Only delete expired entries"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report how many entries would be deleted"
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.MODERATION_VERDICT_CACHE_TTL)
+        stale = Q(created_at__lt=cutoff)
+        if not options['keep_other_versions']:
+            stale |= ~Q(ruleset_version=ruleset_version(get_moderation_backend()))
+
+        entries = VerdictCacheEntry.objects.filter(stale)
+        if options['dry_run']:
+            self.stdout.write(f"Would delete {entries.count()} verdict cache entries.")
+            return
+
+        deleted, _ = entries.delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} verdict cache entries."))
@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from api.archive import archive_horizon
+from api.models import ModerationLog, ModerationDailyStat
+from api.rollups import reconcile_day
+
+
+class Command(BaseCommand):
+    help = "Backfill and reconcile the ModerationDailyStat rollup from ModerationLog"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help="First day to reconcile (YYYY-MM-DD). Defaults to the oldest moderation log."
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help="Only reconcile the last N days"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report differences without writing them"
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+
+        if options['since']:
+            try:
+                start = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+        elif options['days']:
+            start = today - timedelta(days=options['days'] - 1)
+        else:
+            oldest = ModerationLog.objects.aggregate(oldest=Min('created_at'))['oldest']
+            oldest_stat = ModerationDailyStat.objects.aggregate(oldest=Min('date'))['oldest']
+            candidates = [d for d in (oldest and timezone.localdate(oldest), oldest_stat) if d]
+            if not candidates:
+                self.stdout.write("No moderation logs to reconcile.")
+                return
+            start = min(candidates)
+
+        # Archived days are no longer in ModerationLog; their buckets are final
+        horizon = archive_horizon()
+        if horizon and start < timezone.localdate(horizon):
+            start = timezone.localdate(horizon)
+            self.stdout.write(f"Skipping archived days before {start}.")
+
+        totals = [0, 0, 0]
+        day = start
+        while day <= today:
+            changes = reconcile_day(day, dry_run=options['dry_run'])
+            if any(changes):
+                self.stdout.write(
+                    f"{day}: {changes[0]} created, {changes[1]} updated, {changes[2]} deleted"
+                )
+            totals = [total + change for total, change in zip(totals, changes)]
+            day += timedelta(days=1)
+
+        prefix = "Would reconcile" if options['dry_run'] else "Reconciled"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {start} to {today}: {totals[0]} created, {totals[1]} updated, {totals[2]} deleted"
+        ))
@@ -0,0 +1,76 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.jobs import process_pending_jobs, run_worker
+
+
+def _worker_main(stop_event, batch_size, poll_interval):
+    # The parent handles SIGINT/SIGTERM and signals shutdown via stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    run_worker(stop_event, batch_size=batch_size, poll_interval=poll_interval)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run a pool of worker processes that drain the asynchronous moderation queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=2,
+            help="Number of worker processes (default: 2)"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help="Jobs claimed per database round trip (default: 10)"
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty (default: 1.0)"
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Drain the queue in this process and exit"
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = process_pending_jobs(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} moderation jobs."))
+            return
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+
+        stop_event = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(
+                target=_worker_main,
+                args=(stop_event, options['batch_size'], options['poll_interval']),
+                name=f'moderation-worker-{index}',
+            )
+            for index in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} moderation workers. Press Ctrl+C to stop.")
+
+        def shutdown(signum, frame):
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS("Moderation workers stopped."))
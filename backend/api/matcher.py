@@ -0,0 +1,182 @@
+"""
+Multi-pattern keyword matcher used by content moderation.
+
+Rules are compiled once into an Aho-Corasick automaton so each input is
+scanned in a single pass regardless of how many rules are loaded.
+"""
+import hashlib
+from collections import deque
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class Rule(NamedTuple):
+    """A single keyword rule"""
+    keyword: str
+    whole_word: bool = False
+
+
+class Match(NamedTuple):
+    """A rule hit with its character offsets in the original text"""
+    rule: Rule
+    start: int
+    end: int
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a set of keyword rules.
+
+    ``case_fold`` folds both rules and input with ``str.casefold`` while
+    still reporting offsets into the original text. Rules with
+    ``whole_word`` set only match when not surrounded by word characters.
+    """
+
+    def __init__(self, rules, case_fold=True):
+        self.case_fold = case_fold
+        self.rules = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for rule in rules:
+            if isinstance(rule, str):
+                rule = Rule(rule)
+            pattern = self.fold(rule.keyword)
+            if not pattern:
+                continue
+            self.rules.append(rule)
+            self._add(pattern, len(self.rules) - 1)
+
+        self._build_failure_links()
+        self.fingerprint = self._fingerprint()
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _fingerprint(self):
+        """Digest identifying this exact ruleset and its options"""
+        digest = hashlib.sha256(b'casefold' if self.case_fold else b'exact')
+        for rule in self.rules:
+            digest.update(f'\0{int(rule.whole_word)}{rule.keyword}'.encode())
+        return digest.hexdigest()
+
+    def fold(self, text):
+        """Fold ``text`` the way rules and input are compared"""
+        return text.casefold() if self.case_fold else text
+
+    def _add(self, pattern, rule_index):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] += ((rule_index, len(pattern)),)
+
+    def _build_failure_links(self):
+        goto, fail, output = self._goto, self._fail, self._output
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(ch, 0)
+                output[next_state] += output[fail[next_state]]
+
+    def _folded_with_offsets(self, text):
+        """
+        Fold ``text`` and return a mapping from folded to original offsets,
+        or ``None`` when folding preserved the length.
+        """
+        folded = self.fold(text)
+        if len(folded) == len(text):
+            return folded, None
+        pieces, offsets = [], []
+        for index, ch in enumerate(text):
+            piece = self.fold(ch)
+            pieces.append(piece)
+            offsets.extend([index] * len(piece))
+        offsets.append(len(text))
+        return ''.join(pieces), offsets
+
+    def scan(self, text):
+        """Return every rule match in ``text`` in order of end offset"""
+        if not text or not self.rules:
+            return []
+
+        folded, offsets = self._folded_with_offsets(text)
+        goto, fail, output, rules = self._goto, self._fail, self._output, self.rules
+        matches = []
+        state = 0
+
+        for index, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+            end = index + 1
+            for rule_index, length in output[state]:
+                start = end - length
+                if offsets is not None:
+                    start, stop = offsets[start], offsets[end]
+                else:
+                    stop = end
+                rule = rules[rule_index]
+                if rule.whole_word and not self._on_word_boundary(text, start, stop):
+                    continue
+                matches.append(Match(rule, start, stop))
+
+        return matches
+
+    @staticmethod
+    def _on_word_boundary(text, start, end):
+        if start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
+
+
+def load_rules():
+    """Load keyword rules from settings and the optional rules file"""
+    whole_word = settings.MODERATION_WHOLE_WORD
+    keywords = list(settings.MODERATION_KEYWORDS)
+
+    rules_file = settings.MODERATION_RULES_FILE
+    if rules_file:
+        with open(rules_file, encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    keywords.append(line)
+
+    return [Rule(keyword, whole_word=whole_word) for keyword in keywords]
+
+
+@lru_cache(maxsize=None)
+def get_matcher():
+    """Return the process-wide matcher, compiling it on first use"""
+    return KeywordMatcher(load_rules(), case_fold=settings.MODERATION_CASE_FOLD)
+
+
+@receiver(setting_changed)
+def _reset_matcher(setting, **kwargs):
+    if setting.startswith('MODERATION_'):
+        get_matcher.cache_clear()
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('input_type', models.CharField(choices=[('text', 'Text Content'), ('image', 'Image File'), ('url', 'URL/Link')], max_length=10)),
+                ('result', models.CharField(choices=[('safe', 'Safe Content'), ('unsafe', 'Unsafe Content'), ('pending', 'Pending Review'), ('error', 'Processing Error')], max_length=10)),
+                ('risk_level', models.CharField(blank=True, choices=[('low', 'Low Risk'), ('medium', 'Medium Risk'), ('high', 'High Risk'), ('critical', 'Critical Risk')], default='', help_text='Empty when the log has no risk level', max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('processing_time_ms_total', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moderation_daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='api_moderat_date_e50f57_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date', 'input_type', 'result', 'risk_level'), name='unique_moderation_daily_stat')],
+            },
+        ),
+    ]
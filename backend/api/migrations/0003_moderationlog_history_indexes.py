@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_moderationdailystat'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='moderationlog',
+            name='api_moderat_user_id_4b6de0_idx',
+        ),
+        migrations.AddIndex(
+            model_name='moderationlog',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='api_moderat_user_id_d04c08_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moderationlog',
+            index=models.Index(fields=['user', 'result', '-created_at'], name='api_moderat_user_id_8055e6_idx'),
+        ),
+    ]
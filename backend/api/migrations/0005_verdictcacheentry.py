@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_moderationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerdictCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(help_text='SHA-256 of the input type and normalized content', max_length=64)),
+                ('ruleset_version', models.CharField(help_text='SHA-256 of the moderation backend and ruleset that produced the verdict', max_length=64)),
+                ('input_type', models.CharField(choices=[('text', 'Text Content'), ('image', 'Image File'), ('url', 'URL/Link')], max_length=10)),
+                ('result', models.CharField(choices=[('safe', 'Safe Content'), ('unsafe', 'Unsafe Content'), ('pending', 'Pending Review'), ('error', 'Processing Error')], max_length=10)),
+                ('risk_level', models.CharField(blank=True, choices=[('low', 'Low Risk'), ('medium', 'Medium Risk'), ('high', 'High Risk'), ('critical', 'Critical Risk')], max_length=10, null=True)),
+                ('confidence_score', models.FloatField(blank=True, null=True)),
+                ('flags_detected', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='api_verdict_created_f4827d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('content_hash', 'ruleset_version'), name='unique_verdict_cache_entry')],
+            },
+        ),
+    ]
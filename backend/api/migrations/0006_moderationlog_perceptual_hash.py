@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_verdictcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='moderationlog',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, help_text='64-bit dHash of an uploaded image, as hex', max_length=16, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='moderationlog',
+            index=models.Index(condition=models.Q(('input_type', 'image')), fields=['updated_at'], name='moderation_log_image_updated'),
+        ),
+    ]
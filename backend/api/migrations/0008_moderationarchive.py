@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_apiusagelog_request_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month the logs were created in')),
+                ('path', models.CharField(help_text='File name under MODERATION_ARCHIVE_DIR', max_length=255, unique=True)),
+                ('archived_before', models.DateTimeField(help_text='Cutoff of the run that wrote this segment')),
+                ('row_count', models.PositiveIntegerField()),
+                ('min_log_id', models.BigIntegerField()),
+                ('max_log_id', models.BigIntegerField()),
+                ('oldest_created_at', models.DateTimeField()),
+                ('newest_created_at', models.DateTimeField()),
+                ('members', models.JSONField(default=dict, help_text="User id -> [offset, length, rows] of that user's gzip member")),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-newest_created_at'],
+                'indexes': [models.Index(fields=['-newest_created_at'], name='api_moderat_newest__d92fc0_idx')],
+            },
+        ),
+    ]
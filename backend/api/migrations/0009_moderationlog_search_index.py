@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# The only copy of the search index DDL. api.search.install() replays it
+# after later migrations rebuild the table, which drops SQLite triggers, so
+# a schema change belongs in a new migration that install() points at.
+PG_INDEX = (
+    "CREATE INDEX IF NOT EXISTS api_moderationlog_search_idx ON api_moderationlog USING gin "
+    "((to_tsvector('english', coalesce(api_moderationlog.input_value, '') || ' ' || "
+    "coalesce(api_moderationlog.notes, ''))))"
+)
+
+SQLITE_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_moderationlog_fts USING fts5(
+        input_value, notes, content='api_moderationlog', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_moderationlog_fts_insert AFTER INSERT ON api_moderationlog BEGIN
+        INSERT INTO api_moderationlog_fts(rowid, input_value, notes) VALUES (new.id, new.input_value, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_moderationlog_fts_delete AFTER DELETE ON api_moderationlog BEGIN
+        INSERT INTO api_moderationlog_fts(api_moderationlog_fts, rowid, input_value, notes)
+        VALUES ('delete', old.id, old.input_value, old.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_moderationlog_fts_update
+    AFTER UPDATE OF input_value, notes ON api_moderationlog BEGIN
+        INSERT INTO api_moderationlog_fts(api_moderationlog_fts, rowid, input_value, notes)
+        VALUES ('delete', old.id, old.input_value, old.notes);
+        INSERT INTO api_moderationlog_fts(rowid, input_value, notes) VALUES (new.id, new.input_value, new.notes);
+    END
+    """,
+    "INSERT INTO api_moderationlog_fts(api_moderationlog_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS api_moderationlog_fts_insert',
+    'DROP TRIGGER IF EXISTS api_moderationlog_fts_delete',
+    'DROP TRIGGER IF EXISTS api_moderationlog_fts_update',
+    'DROP TABLE IF EXISTS api_moderationlog_fts',
+]
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(PG_INDEX)
+    elif vendor == 'sqlite':
+        for sql in SQLITE_SCHEMA:
+            schema_editor.execute(sql)
+
+
+def uninstall_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS api_moderationlog_search_idx')
+    elif vendor == 'sqlite':
+        for sql in SQLITE_DROP:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_moderationarchive'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
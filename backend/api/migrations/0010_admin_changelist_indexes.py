@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_moderationlog_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apiusagelog',
+            index=models.Index(fields=['-created_at'], name='api_apiusag_created_b6ce17_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apiusagelog',
+            index=models.Index(fields=['status_code', '-created_at'], name='api_apiusag_status__d27eb1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moderationlog',
+            index=models.Index(fields=['-created_at', '-id'], name='api_moderat_created_018fd2_idx'),
+        ),
+    ]
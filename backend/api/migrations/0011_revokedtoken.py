@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('jti', models.UUIDField(help_text="The token's jti claim", primary_key=True, serialize=False)),
+                ('expires_at', models.DateTimeField(help_text="The token's exp claim; the row is purged after this")),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='api_revoked_expires_448467_idx')],
+            },
+        ),
+    ]
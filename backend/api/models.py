@@ -75,6 +75,14 @@ class UserProfile(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
     
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Users authenticated from a cached principal load every other field
+        # on first access, not one query per field
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields, from_queryset)
+    
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}".strip() or self.username
@@ -155,6 +163,12 @@ class ModerationLog(models.Model):
         blank=True,
         help_text="List of specific issues detected"
     )
+    perceptual_hash = models.CharField(
+        max_length=16,
+        blank=True,
+        null=True,
+        help_text="64-bit dHash of an uploaded image, as hex"
+    )
     processing_time_ms = models.IntegerField(
         blank=True,
         null=True,
@@ -181,9 +195,17 @@ class ModerationLog(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['user', 'result', '-created_at']),
             models.Index(fields=['result', '-created_at']),
             models.Index(fields=['input_type', '-created_at']),
+            # Lets the near-duplicate image index catch up on changed rows
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(input_type='image'),
+                name='moderation_log_image_updated'
+            ),
         ]
     
     def __str__(self):
@@ -215,13 +237,172 @@ class APIUsageLog(models.Model):
     method = models.CharField(max_length=10)
     status_code = models.IntegerField()
     response_time_ms = models.IntegerField()
-    ip_address = models.GenericIPAddressField()
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
     user_agent = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the request is recorded, not when the buffered row is written
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
+            models.Index(fields=['-created_at']),
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['endpoint', '-created_at']),
+            models.Index(fields=['status_code', '-created_at']),
+        ]
+
+
+class ModerationDailyStat(models.Model):
+    """
+    Daily rollup of moderation logs per user, input type, result and risk level
+    """
+    user = models.ForeignKey(
+        UserProfile,
+        on_delete=models.CASCADE,
+        related_name='moderation_daily_stats'
+    )
+    date = models.DateField()
+    input_type = models.CharField(max_length=10, choices=ModerationLog.INPUT_TYPES)
+    result = models.CharField(max_length=10, choices=ModerationLog.RESULT_TYPES)
+    risk_level = models.CharField(
+        max_length=10,
+        choices=ModerationLog.RISK_LEVELS,
+        blank=True,
+        default='',
+        help_text="Empty when the log has no risk level"
+    )
+    count = models.PositiveIntegerField(default=0)
+    processing_time_ms_total = models.BigIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date', 'input_type', 'result', 'risk_level'],
+                name='unique_moderation_daily_stat'
+            ),
         ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.date} - {self.input_type}/{self.result}: {self.count}"
+
+
+class ModerationJob(models.Model):
+    """
+    Queue entry for a moderation log processed asynchronously by the workers
+    """
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    moderation_log = models.OneToOneField(
+        ModerationLog,
+        on_delete=models.CASCADE,
+        related_name='job'
+    )
+    status = models.CharField(max_length=10, choices=STATUSES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    lease_expires_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When a running job may be reclaimed from a crashed worker"
+    )
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Job {self.pk} for log {self.moderation_log_id} ({self.status})"
+
+
+class VerdictCacheEntry(models.Model):
+    """
+    Stored moderation verdict for normalized content under one ruleset version
+    """
+    content_hash = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the input type and normalized content"
+    )
+    ruleset_version = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the moderation backend and ruleset that produced the verdict"
+    )
+    input_type = models.CharField(max_length=10, choices=ModerationLog.INPUT_TYPES)
+    result = models.CharField(max_length=10, choices=ModerationLog.RESULT_TYPES)
+    risk_level = models.CharField(max_length=10, choices=ModerationLog.RISK_LEVELS, blank=True, null=True)
+    confidence_score = models.FloatField(blank=True, null=True)
+    flags_detected = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_hash', 'ruleset_version'],
+                name='unique_verdict_cache_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.input_type}) - {self.result}"
+
+
+class ModerationArchive(models.Model):
+    """
+    One compressed segment of moderation logs moved out of ModerationLog.
+
+    The file is gzip JSONL with one gzip member per user, newest log first,
+    so one user's rows can be read without decompressing the others.
+    """
+    month = models.DateField(help_text="First day of the month the logs were created in")
+    path = models.CharField(max_length=255, unique=True, help_text="File name under MODERATION_ARCHIVE_DIR")
+    archived_before = models.DateTimeField(help_text="Cutoff of the run that wrote this segment")
+    row_count = models.PositiveIntegerField()
+    min_log_id = models.BigIntegerField()
+    max_log_id = models.BigIntegerField()
+    oldest_created_at = models.DateTimeField()
+    newest_created_at = models.DateTimeField()
+    members = models.JSONField(
+        default=dict,
+        help_text="User id -> [offset, length, rows] of that user's gzip member"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-newest_created_at']
+        indexes = [
+            models.Index(fields=['-newest_created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.month:%Y-%m} ({self.row_count} logs)"
+
+
+class RevokedToken(models.Model):
+    """
+    Refresh token that may no longer be used, kept only until it expires
+    """
+    jti = models.UUIDField(primary_key=True, help_text="The token's jti claim")
+    expires_at = models.DateTimeField(help_text="The token's exp claim; the row is purged after this")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.jti} (expires {self.expires_at:%Y-%m-%d %H:%M})"
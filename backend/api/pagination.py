@@ -0,0 +1,144 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+from .archive import sort_key
+
+ARCHIVE_POSITION = 'archive:'
+
+
+class ModerationLogCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a user's logs, newest first.
+
+    Walks the (user, -created_at, -id) index without COUNT(*) or OFFSET
+    scans, so deep pages cost the same as the first one.
+
+    If the view has ``get_archived_history()`` and the user has archived
+    logs, each page merges the live and archived logs by creation time.
+    Old logs that stay live, such as pending ones, can be older than
+    archived ones. These cursors carry the last log's ``created_at`` and id
+    and only link forwards.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.archive_position = None
+        get_archived_history = getattr(view, 'get_archived_history', None)
+        if get_archived_history is None:
+            return super().paginate_queryset(queryset, request, view)
+
+        cursor = self.decode_cursor(request)
+        if cursor and cursor.position and cursor.position.startswith(ARCHIVE_POSITION):
+            return self._merged_page(queryset, get_archived_history(), request, self._archive_after(cursor.position))
+        history = get_archived_history()
+        if not (cursor and cursor.reverse) and history.exists():
+            # Cursors issued before the user had archived logs continue in merged order
+            after = self._live_after(queryset, cursor) if cursor and cursor.position else None
+            return self._merged_page(queryset, history, request, after)
+        return super().paginate_queryset(queryset, request, view)
+
+    def _live_after(self, queryset, cursor):
+        created_at = parse_datetime(cursor.position)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        # The next page starts after the position, skipping ``offset`` logs
+        if cursor.offset:
+            shown = queryset.filter(created_at__lt=created_at).order_by(*self.ordering)
+            shown = shown.values_list('created_at', 'pk')[cursor.offset - 1:cursor.offset]
+            return shown[0] if shown else (created_at, 0)
+        return created_at, 0
+
+    def _archive_after(self, position):
+        position = position[len(ARCHIVE_POSITION):]
+        if not position:
+            return None
+        created_at, _, pk = position.rpartition('|')
+        try:
+            created_at, pk = parse_datetime(created_at), int(pk)
+        except ValueError:
+            created_at = None
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+    def _merged_page(self, queryset, history, request, after):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = None
+        self.has_previous = False
+
+        live = queryset.order_by(*self.ordering)
+        if after is not None:
+            created_at, pk = after
+            live = live.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+        live = list(live[:self.page_size + 1])
+        # A full page of live logs bounds how old the archived logs on it can be
+        until = live[-1].created_at if len(live) > self.page_size else None
+        merged = heapq.merge(live, history.iterate(after, until), key=lambda log: sort_key(log.created_at, log.pk))
+        logs = list(islice(merged, self.page_size + 1))
+
+        self.has_next = len(logs) > self.page_size
+        self.page = logs[:self.page_size]
+        if self.has_next:
+            last = self.page[-1]
+            self.archive_position = f'{ARCHIVE_POSITION}{last.created_at.isoformat()}|{last.pk}'
+        return self.page
+
+    def get_next_link(self):
+        if self.archive_position is not None:
+            return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.archive_position))
+        return super().get_next_link()
+
+
+def estimated_count(model, using='default'):
+    """
+    Approximate row count of ``model``'s table without scanning it.
+
+    PostgreSQL's planner statistics are used when they cover a table larger
+    than ``ADMIN_COUNT_LIMIT``; otherwise an exact count is cached for
+    ``ADMIN_COUNT_CACHE_TTL`` seconds.
+    """
+    table = model._meta.db_table
+    db = connections[using]
+    if db.vendor == 'postgresql':
+        with db.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+        # reltuples is -1 or 0 until the table has been analyzed
+        if row and row[0] > settings.ADMIN_COUNT_LIMIT:
+            return row[0]
+    return cache.get_or_set(
+        f'admin:count:{using}:{table}',
+        lambda: model._default_manager.using(using).count(),
+        settings.ADMIN_COUNT_CACHE_TTL,
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin changelist paginator for tables too large to COUNT(*) per page view.
+
+    Unfiltered lists use ``estimated_count``. Filtered lists count at most
+    ``ADMIN_COUNT_LIMIT`` matching rows, so beyond that the page links stop
+    and narrower filters are needed.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return estimated_count(queryset.model, queryset.db)
+        return queryset.order_by().values('pk')[:settings.ADMIN_COUNT_LIMIT].count()
@@ -0,0 +1,10 @@
+from rest_framework import permissions
+
+
+class IsAdminRole(permissions.BasePermission):
+    """
+    Allow access only to users with the BrandSafe admin role
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_admin)
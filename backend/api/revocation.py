@@ -0,0 +1,127 @@
+"""
+Refresh token revocation.
+
+Revoked jtis live in ``RevokedToken`` until the token would have expired.
+Each process keeps a Bloom filter per expiry day in front of the table, so
+checking a token that was never revoked (nearly every refresh) does not
+touch the database, and a whole day's filter is dropped once its tokens
+have expired.
+
+Filters only see the revocations made by their own process and those in
+the table when they were loaded. That is safe for rotation: ``revoke()``
+inserts the jti, and the primary key rejects a token that any process
+revoked first.
+"""
+import threading
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .bloom import BloomFilter
+from .models import RevokedToken
+
+SECONDS_PER_DAY = 86400
+
+
+class RevocationFilter:
+    """
+    Bloom filters of revoked jtis, one per UTC day of token expiry
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._days = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(bloom) for bloom in self._days.values())
+
+    def _drop_expired(self, today):
+        for day in [day for day in self._days if day < today]:
+            del self._days[day]
+
+    def add(self, jti, exp):
+        day = exp // SECONDS_PER_DAY
+        with self._lock:
+            bloom = self._days.get(day)
+            if bloom is None:
+                self._drop_expired(int(timezone.now().timestamp()) // SECONDS_PER_DAY)
+                bloom = self._days[day] = BloomFilter(self.capacity, self.error_rate)
+            bloom.add(jti.bytes)
+
+    def might_contain(self, jti, exp):
+        bloom = self._days.get(exp // SECONDS_PER_DAY)
+        return bloom is not None and jti.bytes in bloom
+
+    def load(self, batch_size=10000):
+        """Add every unexpired revocation in the table"""
+        rows = RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', 'expires_at')
+        for jti, expires_at in rows.iterator(chunk_size=batch_size):
+            self.add(jti, int(expires_at.timestamp()))
+
+
+@lru_cache(maxsize=None)
+def revocation_filter():
+    revoked = RevocationFilter(settings.TOKEN_REVOCATION_FILTER_CAPACITY, settings.TOKEN_REVOCATION_FILTER_ERROR_RATE)
+    revoked.load()
+    return revoked
+
+
+@receiver(setting_changed)
+def _reset_revocation_filter(setting, **kwargs):
+    if setting.startswith('TOKEN_REVOCATION_FILTER'):
+        revocation_filter.cache_clear()
+
+
+def _token_key(token):
+    try:
+        return uuid.UUID(hex=str(token[api_settings.JTI_CLAIM])), int(token['exp'])
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidToken("Token has no valid jti or exp claim") from e
+
+
+def is_revoked(token):
+    """
+    Whether ``token`` has been revoked. Only tokens the filter might
+    contain are looked up in the table.
+    """
+    jti, exp = _token_key(token)
+    if not revocation_filter().might_contain(jti, exp):
+        return False
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def revoke(token):
+    """
+    Revoke ``token`` until it expires. Returns False if it had already
+    been revoked, by any process.
+    """
+    jti, exp = _token_key(token)
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=datetime.fromtimestamp(exp, tz=dt_timezone.utc))
+        revoked = True
+    except IntegrityError:
+        revoked = False
+    revocation_filter().add(jti, exp)
+    return revoked
+
+
+def purge_expired(batch_size=5000):
+    """Delete revocations of tokens that have expired, in batches. Returns the number deleted."""
+    expired = RevokedToken.objects.filter(expires_at__lte=timezone.now())
+    deleted = 0
+    while True:
+        batch = list(expired.values_list('jti', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += RevokedToken.objects.filter(jti__in=batch).delete()[0]
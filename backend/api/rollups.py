@@ -0,0 +1,133 @@
+"""
+Maintenance of the ModerationDailyStat rollup table.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ModerationLog, ModerationDailyStat
+
+ROLLUP_KEY_FIELDS = ('user_id', 'date', 'input_type', 'result', 'risk_level')
+
+
+def _rollup_key(moderation_log):
+    return {
+        'user_id': moderation_log.user_id,
+        'date': timezone.localdate(moderation_log.created_at),
+        'input_type': moderation_log.input_type,
+        'result': moderation_log.result,
+        'risk_level': moderation_log.risk_level or '',
+    }
+
+
+def _bump(key, count, processing_time):
+    updated = ModerationDailyStat.objects.filter(**key).update(
+        count=F('count') + count,
+        processing_time_ms_total=F('processing_time_ms_total') + processing_time,
+    )
+    if updated or count < 0:
+        return
+
+    try:
+        with transaction.atomic():
+            ModerationDailyStat.objects.create(
+                count=count, processing_time_ms_total=processing_time, **key
+            )
+    except IntegrityError:
+        # A concurrent request created the bucket first
+        ModerationDailyStat.objects.filter(**key).update(
+            count=F('count') + count,
+            processing_time_ms_total=F('processing_time_ms_total') + processing_time,
+        )
+
+
+def record_moderation(moderation_log, count=1):
+    """
+    Add a finished moderation log to its daily rollup bucket.
+
+    Pass ``count=-1`` to take a log back out of the bucket it was counted in.
+    """
+    _bump(
+        _rollup_key(moderation_log),
+        count,
+        (moderation_log.processing_time_ms or 0) * count,
+    )
+
+
+def move_moderation(previous, moderation_log):
+    """Move an edited log from the bucket ``previous`` was counted in to its current one"""
+    if (
+        _rollup_key(previous) != _rollup_key(moderation_log)
+        or previous.processing_time_ms != moderation_log.processing_time_ms
+    ):
+        record_moderation(previous, count=-1)
+        record_moderation(moderation_log)
+
+
+def record_moderations(moderation_logs, count=1):
+    """Add many finished logs, or take them out, issuing one update per touched bucket"""
+    buckets = {}
+    for moderation_log in moderation_logs:
+        key = tuple(_rollup_key(moderation_log).items())
+        bucket = buckets.setdefault(key, [0, 0])
+        bucket[0] += count
+        bucket[1] += (moderation_log.processing_time_ms or 0) * count
+
+    for key, (count, processing_time) in buckets.items():
+        _bump(dict(key), count, processing_time)
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def reconcile_day(day, dry_run=False):
+    """
+    Rebuild the rollup buckets for ``day`` from ModerationLog.
+
+    Returns a ``(created, updated, deleted)`` tuple of bucket counts.
+    """
+    start, end = _day_bounds(day)
+    expected = {}
+    grouped = (
+        ModerationLog.objects.filter(created_at__gte=start, created_at__lt=end)
+        .order_by()
+        .values('user_id', 'input_type', 'result', 'risk_level')
+        .annotate(count=Count('id'), processing_time_ms_total=Coalesce(Sum('processing_time_ms'), 0))
+    )
+    for row in grouped:
+        key = (row['user_id'], day, row['input_type'], row['result'], row['risk_level'] or '')
+        bucket = expected.setdefault(key, [0, 0])
+        bucket[0] += row['count']
+        bucket[1] += row['processing_time_ms_total']
+
+    created = updated = deleted = 0
+    with transaction.atomic():
+        for stat in ModerationDailyStat.objects.filter(date=day).select_for_update():
+            key = tuple(getattr(stat, field) for field in ROLLUP_KEY_FIELDS)
+            counts = expected.pop(key, None)
+            if counts is None:
+                deleted += 1
+                if not dry_run:
+                    stat.delete()
+            elif [stat.count, stat.processing_time_ms_total] != counts:
+                updated += 1
+                if not dry_run:
+                    stat.count, stat.processing_time_ms_total = counts
+                    stat.save(update_fields=['count', 'processing_time_ms_total'])
+
+        created = len(expected)
+        if not dry_run:
+            ModerationDailyStat.objects.bulk_create([
+                ModerationDailyStat(
+                    count=count, processing_time_ms_total=processing_time,
+                    **dict(zip(ROLLUP_KEY_FIELDS, key))
+                )
+                for key, (count, processing_time) in expected.items()
+            ])
+
+    return created, updated, deleted
@@ -0,0 +1,164 @@
+"""
+Full-text search over moderation log content.
+
+On SQLite the ``input_value`` and ``notes`` columns are indexed by an FTS5
+table that triggers keep in step with ``api_moderationlog``; on PostgreSQL a
+GIN index covers the matching ``tsvector`` expression. Either way a search
+is an index lookup rather than a ``LIKE '%term%'`` scan of every log.
+"""
+import re
+from html import escape
+from importlib import import_module
+
+from django.db import connection, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import ModerationLog
+
+FTS_TABLE = 'api_moderationlog_fts'
+INDEX_MIGRATION = '0009_moderationlog_search_index'
+PG_DOCUMENT = "coalesce(api_moderationlog.input_value, '') || ' ' || coalesce(api_moderationlog.notes, '')"
+PG_VECTOR = f"to_tsvector('english', {PG_DOCUMENT})"
+
+# Private-use characters mark matches until the snippet has been escaped
+MARK_START, MARK_STOP = '\ue000', '\ue001'
+PG_HEADLINE_OPTIONS = f'StartSel="{MARK_START}", StopSel="{MARK_STOP}", MaxWords=30, MinWords=12, MaxFragments=2'
+
+SQLITE_TRIGGERS = tuple(f'{FTS_TABLE}_{event}' for event in ('insert', 'delete', 'update'))
+
+
+def install(using='default'):
+    """
+    Create the search index if it is missing. Safe to run repeatedly.
+
+    SQLite drops a table's triggers whenever a migration rebuilds it, so if
+    any trigger is missing the schema is recreated and the FTS table rebuilt
+    from the logs. The DDL itself is the index migration's.
+    """
+    schema = import_module(f'{__package__}.migrations.{INDEX_MIGRATION}')
+    db = connections[using]
+    with db.cursor() as cursor:
+        if db.vendor == 'postgresql':
+            cursor.execute(schema.PG_INDEX)
+            return
+        if db.vendor != 'sqlite':
+            return
+
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'api_moderationlog'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if not existing.issuperset(SQLITE_TRIGGERS):
+            for sql in schema.SQLITE_SCHEMA:
+                cursor.execute(sql)
+
+
+def install_after_migrate(sender, using, **kwargs):
+    """post_migrate receiver restoring triggers dropped by later table rebuilds"""
+    applied = MigrationRecorder(connections[using]).applied_migrations()
+    if ('api', INDEX_MIGRATION) in applied:
+        install(using)
+
+
+def _terms(text):
+    return re.findall(r'\w+\*?', text)
+
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 query matching every word, so user input
+    can never be a syntax error. A trailing ``*`` keeps prefix matching.
+    """
+    return ' '.join(
+        f'"{term[:-1]}"*' if term.endswith('*') else f'"{term}"' for term in _terms(text)
+    )
+
+
+def tsquery(text):
+    """The same query as ``fts_query`` in PostgreSQL ``to_tsquery`` syntax"""
+    return ' & '.join(f'{term[:-1]}:*' if term.endswith('*') else term for term in _terms(text))
+
+
+def has_terms(text):
+    """Whether ``text`` contains any word to search for"""
+    return bool(fts_query(text))
+
+
+def matches(text):
+    """Return a ``filter()`` argument selecting the ModerationLogs that match ``text``"""
+    if not has_terms(text):
+        # An empty FTS5 MATCH is a syntax error
+        return Q(pk__in=[])
+    if connection.vendor == 'postgresql':
+        return RawSQL(f"{PG_VECTOR} @@ to_tsquery('english', %s)", [tsquery(text)], output_field=BooleanField())
+    return Q(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [fts_query(text)]))
+
+
+def highlight(snippet):
+    """HTML-escape a snippet and wrap its matches in ``<mark>``"""
+    return escape(snippet or '').replace(MARK_START, '<mark>').replace(MARK_STOP, '</mark>')
+
+
+def _sqlite_hits(text, user_id, limit, offset):
+    query = fts_query(text)
+    if not query:
+        return []
+    scope, params = ('AND log.user_id = %s', [user_id]) if user_id is not None else ('', [])
+    with connection.cursor() as cursor:
+        # bm25() is lower for better matches
+        cursor.execute(
+            f"""
+            SELECT {FTS_TABLE}.rowid, -bm25({FTS_TABLE}),
+                   snippet({FTS_TABLE}, -1, %s, %s, '…', 16)
+            FROM {FTS_TABLE} JOIN api_moderationlog log ON log.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s {scope}
+            ORDER BY bm25({FTS_TABLE}), {FTS_TABLE}.rowid DESC
+            LIMIT %s OFFSET %s
+            """,
+            [MARK_START, MARK_STOP, query, *params, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def _postgresql_hits(text, user_id, limit, offset):
+    scope, params = ('AND api_moderationlog.user_id = %s', [user_id]) if user_id is not None else ('', [])
+    with connection.cursor() as cursor:
+        # Headlines are expensive, so only build them for the page of hits
+        cursor.execute(
+            f"""
+            SELECT hit.id, hit.rank, ts_headline('english', {PG_DOCUMENT}, hit.query, %s)
+            FROM (
+                SELECT api_moderationlog.id, ts_rank({PG_VECTOR}, query) AS rank, query
+                FROM api_moderationlog, to_tsquery('english', %s) query
+                WHERE {PG_VECTOR} @@ query {scope}
+                ORDER BY rank DESC, api_moderationlog.id DESC
+                LIMIT %s OFFSET %s
+            ) hit JOIN api_moderationlog ON api_moderationlog.id = hit.id
+            ORDER BY hit.rank DESC, hit.id DESC
+            """,
+            [PG_HEADLINE_OPTIONS, tsquery(text), *params, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def search(text, user_id=None, limit=20, offset=0, queryset=None):
+    """
+    Return the logs matching ``text``, best match first, each with ``rank``
+    (higher is better) and ``highlight`` (an HTML snippet) attributes.
+
+    Pass ``user_id`` to search only that user's logs.
+    """
+    hits = (_postgresql_hits if connection.vendor == 'postgresql' else _sqlite_hits)(text, user_id, limit, offset)
+    queryset = ModerationLog.objects.all() if queryset is None else queryset
+    logs = queryset.in_bulk([log_id for log_id, _, _ in hits])
+
+    results = []
+    for log_id, rank, snippet in hits:
+        log = logs.get(log_id)
+        if log is not None:
+            log.rank = rank
+            log.highlight = highlight(snippet)
+            results.append(log)
+    return results
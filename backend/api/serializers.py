@@ -1,7 +1,9 @@
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
+from .exports import EXPORT_FORMATS
 from .models import UserProfile, ModerationLog
 
 
@@ -100,7 +102,6 @@ class ModerationRequestSerializer(serializers.ModelSerializer):
     """
     Serializer for content moderation requests
     """
-    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
     
     class Meta:
         model = ModerationLog
@@ -123,9 +124,75 @@ class ModerationRequestSerializer(serializers.ModelSerializer):
                 f"{input_type.title()} content is required for {input_type} moderation."
             )
         
+        if input_type == 'image':
+            # Taken by ImageUploadHandler while the upload streamed in
+            data['perceptual_hash'] = getattr(input_file, 'perceptual_hash', None)
+        
         return data
 
 
+class ModerationModeSerializer(serializers.Serializer):
+    """
+    Query parameters for POST /api/moderate/
+    """
+    mode = serializers.ChoiceField(
+        choices=[('sync', 'Moderate within the request'), ('async', 'Queue for the workers')],
+        default='sync'
+    )
+
+
+class ModerationPollSerializer(serializers.Serializer):
+    """
+    Query parameters for polling a moderation result
+    """
+    wait = serializers.FloatField(
+        min_value=0,
+        default=0,
+        help_text="Seconds to wait for a pending result before responding"
+    )
+    
+    def validate_wait(self, value):
+        return min(value, settings.MODERATION_LONG_POLL_MAX_SECONDS)
+
+
+class BatchModerationRequestSerializer(serializers.Serializer):
+    """
+    Serializer for batch moderation requests.
+
+    Items are validated individually by the view so that one bad item
+    does not reject the whole batch.
+    """
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        help_text="Items with input_type, input_value and optional notes"
+    )
+    
+    def validate_items(self, items):
+        max_items = settings.MODERATION_BATCH_MAX_ITEMS
+        if len(items) > max_items:
+            raise serializers.ValidationError(
+                f"A batch may contain at most {max_items} items."
+            )
+        return items
+
+
+class BatchItemSerializer(ModerationRequestSerializer):
+    """
+    A single batch item. Batches are JSON, so image uploads are not accepted.
+    """
+    
+    class Meta(ModerationRequestSerializer.Meta):
+        fields = ('input_type', 'input_value', 'notes')
+    
+    def validate_input_type(self, value):
+        if value == 'image':
+            raise serializers.ValidationError(
+                "Image moderation is not supported in batches."
+            )
+        return value
+
+
 class ModerationLogSerializer(serializers.ModelSerializer):
     """
     Serializer for moderation log responses
@@ -146,6 +213,84 @@ class ModerationLogSerializer(serializers.ModelSerializer):
         )
 
 
+class CompactModerationLogSerializer(ModerationLogSerializer):
+    """
+    Moderation log with the user reduced to its id
+    """
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+
+
+USER_FORMATS = [
+    ('full', 'Nested user profile on every log'),
+    ('id', 'User id only'),
+    ('sideload', 'User id on every log plus one users block per response'),
+]
+
+
+def get_log_serializer_class(user_format):
+    """Return the log serializer for a ``user_format`` query value"""
+    if user_format == 'full':
+        return ModerationLogSerializer
+    return CompactModerationLogSerializer
+
+
+def sideload_users(logs):
+    """
+    Serialize each distinct user of ``logs`` once, reusing users already
+    loaded on the logs and fetching the rest in one query
+    """
+    users, missing = {}, set()
+    for log in logs:
+        if ModerationLog.user.is_cached(log):
+            users[log.user_id] = log.user
+        else:
+            missing.add(log.user_id)
+    users.update(UserProfile.objects.in_bulk(missing - users.keys()))
+    return UserProfileSerializer(users.values(), many=True).data
+
+
+class LogFormatSerializer(serializers.Serializer):
+    """
+    Query parameters selecting how users are represented in log listings
+    """
+    user_format = serializers.ChoiceField(choices=USER_FORMATS, default='full')
+
+
+class ModerationLogFilterSerializer(serializers.Serializer):
+    """
+    Query parameters for filtering a user's moderation logs
+    """
+    result = serializers.ChoiceField(choices=ModerationLog.RESULT_TYPES, required=False)
+    input_type = serializers.ChoiceField(choices=ModerationLog.INPUT_TYPES, required=False)
+    risk_level = serializers.ChoiceField(choices=ModerationLog.RISK_LEVELS, required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+
+class ModerationHistoryFilterSerializer(LogFormatSerializer, ModerationLogFilterSerializer):
+    """
+    Query parameters for filtering moderation history
+    """
+
+
+class ModerationExportSerializer(ModerationLogFilterSerializer):
+    """
+    Query parameters for exporting moderation history
+    """
+    export_format = serializers.ChoiceField(choices=EXPORT_FORMATS, default='csv')
+    gzip = serializers.BooleanField(default=False, help_text="Compress the export with gzip")
+
+
+class ModerationSearchSerializer(LogFormatSerializer):
+    """
+    Query parameters for full-text search over moderation content
+    """
+    q = serializers.CharField(max_length=200, help_text="Words to find in the content or notes; end a word with * to match prefixes")
+    user_id = serializers.IntegerField(required=False, help_text="Only search this user's logs (admins only)")
+    limit = serializers.IntegerField(default=20, min_value=1, max_value=100)
+    offset = serializers.IntegerField(default=0, min_value=0)
+
+
 class DashboardStatsSerializer(serializers.Serializer):
     """
     Serializer for dashboard analytics
@@ -160,4 +305,5 @@ class DashboardStatsSerializer(serializers.Serializer):
     checks_this_month = serializers.IntegerField()
     recent_logs = ModerationLogSerializer(many=True, read_only=True)
     risk_breakdown = serializers.DictField()
-    type_breakdown = serializers.DictField()
\ No newline at end of file
+    type_breakdown = serializers.DictField()
+    verdict_cache = serializers.DictField(required=False, help_text="Verdict cache hit/miss counters (admins only)")
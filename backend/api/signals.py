@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_principal
+from .cache import invalidate_dashboard
+from .imageindex import get_image_index
+from .models import ModerationLog, UserProfile
+
+
+@receiver(post_save, sender=ModerationLog)
+@receiver(post_delete, sender=ModerationLog)
+def invalidate_dashboard_cache(sender, instance, **kwargs):
+    """Drop cached dashboards affected by a new, changed or deleted log"""
+    # Wait for the commit so the rollup update in the same transaction is visible
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_dashboard([user_id]))
+
+
+@receiver(post_save, sender=ModerationLog)
+def update_image_index(sender, instance, **kwargs):
+    """Add newly unsafe images to this process's near-duplicate index"""
+    if instance.input_type != 'image' or not instance.perceptual_hash:
+        return
+    if not get_image_index.cache_info().currsize:
+        # Not loaded yet; the first lookup reads this row from the database
+        return
+    verdict = {
+        'result': instance.result,
+        'risk_level': instance.risk_level,
+        'confidence_score': instance.confidence_score,
+    }
+    log_id, perceptual_hash = instance.pk, instance.perceptual_hash
+    transaction.on_commit(lambda: get_image_index().update(log_id, perceptual_hash, verdict))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_principal(sender, instance, **kwargs):
+    """Drop the cached principal of a changed or deleted user"""
+    # Again after the commit, in case a request cached the old row meanwhile
+    user_id = instance.pk
+    invalidate_principal(user_id)
+    transaction.on_commit(lambda: invalidate_principal(user_id))
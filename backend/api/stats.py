@@ -0,0 +1,86 @@
+"""
+Dashboard statistics for moderation logs.
+
+``get_rollup_stats`` answers the dashboard from the ModerationDailyStat
+rollup in O(days) rather than counting ModerationLog.
+"""
+from datetime import timedelta
+
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ModerationLog, ModerationDailyStat
+
+
+def _stats_aggregates(metric, time_field, windows):
+    """
+    Aggregate expressions for every dashboard counter, where ``metric(q)``
+    counts the rows matching ``q`` and ``windows`` are the today/week/month
+    lower bounds
+    """
+    today, week, month = windows
+    aggregates = {
+        'total_checks': metric(Q()),
+        'safe_count': metric(Q(result='safe')),
+        'unsafe_count': metric(Q(result='unsafe')),
+        'pending_count': metric(Q(result='pending')),
+        'checks_today': metric(Q(**{f'{time_field}__gte': today})),
+        'checks_this_week': metric(Q(**{f'{time_field}__gte': week})),
+        'checks_this_month': metric(Q(**{f'{time_field}__gte': month})),
+    }
+    for risk_level, _ in ModerationLog.RISK_LEVELS:
+        aggregates[f'risk__{risk_level}'] = metric(Q(risk_level=risk_level))
+    for input_type, _ in ModerationLog.INPUT_TYPES:
+        aggregates[f'type__{input_type}'] = metric(Q(input_type=input_type))
+    return aggregates
+
+
+def _stats_from_row(row):
+    stats = {'risk_breakdown': {}, 'type_breakdown': {}}
+    for key, count in row.items():
+        if key.startswith('risk__'):
+            if count:
+                stats['risk_breakdown'][key[len('risk__'):]] = count
+        elif key.startswith('type__'):
+            if count:
+                stats['type_breakdown'][key[len('type__'):]] = count
+        else:
+            stats[key] = count
+
+    total_checks = stats['total_checks']
+    safety_rate = (stats['safe_count'] / total_checks * 100) if total_checks > 0 else 0
+    stats['safety_rate'] = round(safety_rate, 2)
+    return stats
+
+
+def _rollup_query(user):
+    stats = ModerationDailyStat.objects.all()
+    if user is not None:
+        stats = stats.filter(user=user)
+
+    today = timezone.localdate()
+    aggregates = _stats_aggregates(
+        lambda q: Coalesce(Sum('count', filter=q), 0),
+        'date',
+        (today, today - timedelta(days=6), today - timedelta(days=29)),
+    )
+    return stats.order_by(), aggregates
+
+
+def get_rollup_stats(user=None):
+    """
+    Compute the dashboard figures from the daily rollup, for one user or
+    for everyone when ``user`` is None.
+
+    Time windows are whole days: "this week" covers today and the previous
+    six days, "this month" today and the previous 29.
+    """
+    stats, aggregates = _rollup_query(user)
+    return _stats_from_row(stats.aggregate(**aggregates))
+
+
+async def aget_rollup_stats(user=None):
+    """Async ``get_rollup_stats`` for ASGI views"""
+    stats, aggregates = _rollup_query(user)
+    return _stats_from_row(await stats.aaggregate(**aggregates))
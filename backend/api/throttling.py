@@ -0,0 +1,91 @@
+"""
+Request throttling for the moderation endpoints.
+"""
+import math
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+
+class SlidingWindowRateThrottle(ScopedRateThrottle):
+    """
+    Per-user quota for views with a ``throttle_scope``, resolved by role.
+
+    The rate comes from ``DEFAULT_THROTTLE_RATES['<scope>_<role>']`` when it
+    exists (``moderate_admin``), otherwise from ``['<scope>']``. Anonymous
+    requests are keyed by client IP.
+
+    Requests are counted in fixed windows of the rate's period, and the
+    previous window's count is weighted by how much of it still overlaps the
+    sliding window. Each request costs one ``get_many`` and one ``incr``
+    against the cache, however high the quota.
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def get_rate(self):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        role = getattr(self.user, 'role', None)
+        return rates.get(f'{self.scope}_{role}', rates.get(self.scope))
+
+    def allow_request(self, request, view):
+        keys = self.window_keys(request, view)
+        if keys is None:
+            return True
+        if not self.admits(self.cache.get_many(keys), keys):
+            return self.throttle_failure()
+        if not self.cache.add(keys[1], 1, self.duration * 2):
+            try:
+                self.cache.incr(keys[1])
+            except ValueError:
+                # Expired between add() and incr()
+                self.cache.set(keys[1], 1, self.duration * 2)
+        return True
+
+    async def aallow_request(self, request, view):
+        """``allow_request`` for async views, through the async cache API"""
+        keys = self.window_keys(request, view)
+        if keys is None:
+            return True
+        if not self.admits(await self.cache.aget_many(keys), keys):
+            return self.throttle_failure()
+        if not await self.cache.aadd(keys[1], 1, self.duration * 2):
+            try:
+                await self.cache.aincr(keys[1])
+            except ValueError:
+                await self.cache.aset(keys[1], 1, self.duration * 2)
+        return True
+
+    def window_keys(self, request, view):
+        """Return the previous and current window keys, or None if unthrottled"""
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return None
+        self.user = request.user
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return None
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        key = self.get_cache_key(request, view)
+        window, self.elapsed = divmod(self.timer(), self.duration)
+        return [f'{key}:{int(window) - 1}', f'{key}:{int(window)}']
+
+    def admits(self, counts, keys):
+        self.previous = counts.get(keys[0], 0)
+        self.current = counts.get(keys[1], 0)
+        return self.estimate(self.elapsed) < self.num_requests
+
+    def estimate(self, elapsed):
+        return self.previous * (1 - elapsed / self.duration) + self.current
+
+    def wait(self):
+        """Whole seconds until the sliding estimate is below the quota again"""
+        limit = self.num_requests
+        if self.current < limit:
+            # Only the previous window's decaying share is in the way
+            seconds = self.duration - self.elapsed - self.duration * (limit - self.current) / self.previous
+        else:
+            # Wait for the next window, then for this one's share to decay
+            seconds = 2 * self.duration - self.elapsed - self.duration * limit / max(self.current, 1)
+        # At exactly ``seconds`` the estimate still equals the quota
+        return math.floor(seconds) + 1
@@ -0,0 +1,65 @@
+"""
+JWT issuance carrying the claims ``CachedJWTAuthentication`` can trust.
+"""
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import PRINCIPAL_CLAIMS, get_principal, principal_user
+from .revocation import is_revoked, revoke
+
+
+class PrincipalRefreshToken(RefreshToken):
+    """
+    Refresh token with the user's role and verification status, which its
+    access tokens inherit
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in PRINCIPAL_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class PrincipalTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that checks the user through the principal cache and
+    reissues the role claims from it, so they are never older than one
+    access token lifetime. Rotated tokens are revoked in ``RevokedToken``.
+    """
+    token_class = PrincipalRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_revoked(refresh):
+            raise InvalidToken("Token is blacklisted")
+        try:
+            principal = get_principal(refresh[api_settings.USER_ID_CLAIM])
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        user = principal_user(principal) if principal is not None else None
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        for claim in PRINCIPAL_CLAIMS:
+            refresh[claim] = getattr(user, claim)
+
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            # The insert is the authoritative check, for tokens revoked by
+            # other processes since their filter was loaded
+            if not revoke(refresh):
+                raise InvalidToken("Token is blacklisted")
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+
+        return data
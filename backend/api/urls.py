@@ -1,10 +1,20 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
-from . import views
+from . import async_views, views
+
+if settings.ASYNC_API_VIEWS:
+    health_check = async_views.health_check
+    content_moderation = async_views.content_moderation
+    dashboard = async_views.dashboard
+else:
+    health_check = views.health_check
+    content_moderation = views.ContentModerationView.as_view()
+    dashboard = views.DashboardView.as_view()
 
 urlpatterns = [
     # Health check
-    path('health/', views.health_check, name='health_check'),
+    path('health/', health_check, name='health_check'),
     
     # Authentication endpoints
     path('auth/register/', views.UserRegistrationView.as_view(), name='user_register'),
@@ -15,9 +25,14 @@ urlpatterns = [
     path('profile/', views.UserProfileView.as_view(), name='user_profile'),
     
     # Content moderation
-    path('moderate/', views.ContentModerationView.as_view(), name='content_moderation'),
+    path('moderate/', content_moderation, name='content_moderation'),
+    path('moderate/batch/', views.BatchModerationView.as_view(), name='batch_moderation'),
+    path('moderate/<int:pk>/', views.ModerationResultView.as_view(), name='moderation_result'),
     path('history/', views.ModerationHistoryView.as_view(), name='moderation_history'),
+    path('history/export/', views.ModerationExportView.as_view(), name='moderation_export'),
+    path('history/search/', views.ModerationSearchView.as_view(), name='moderation_search'),
     
     # Dashboard
-    path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
+    path('dashboard/', dashboard, name='dashboard'),
+    path('dashboard/cache-stats/', views.DashboardCacheStatsView.as_view(), name='dashboard_cache_stats'),
 ]
\ No newline at end of file
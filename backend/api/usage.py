@@ -0,0 +1,192 @@
+"""
+Buffered API usage logging.
+
+Requests append a row to an in-process ring buffer and return; a background
+thread writes the buffer to ``APIUsageLog`` with ``bulk_create`` once it
+holds ``API_USAGE_LOG_BATCH_SIZE`` rows or every
+``API_USAGE_LOG_FLUSH_INTERVAL`` seconds. When the database falls behind the
+buffer drops its oldest rows instead of growing without bound.
+"""
+import atexit
+import ipaddress
+import logging
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from .models import APIUsageLog
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = ('user_id', 'endpoint', 'method', 'status_code', 'response_time_ms', 'ip_address',
+                'user_agent', 'created_at')
+
+
+class UsageBuffer:
+    """
+    Bounded buffer of usage rows with a background flush thread
+    """
+
+    def __init__(self, capacity=10000, batch_size=500, flush_interval=2.0):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+
+        self._entries = deque(maxlen=capacity)
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='usage-log-flusher', daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def record(self, *row):
+        """Queue one row of ``USAGE_FIELDS`` values"""
+        entries = self._entries
+        if len(entries) == self.capacity:
+            # The deque discards the oldest row to make room
+            self.dropped += 1
+        entries.append(row)
+        if len(entries) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write every queued row and return how many were written"""
+        with self._flush_lock:
+            rows = []
+            while True:
+                try:
+                    rows.append(self._entries.popleft())
+                except IndexError:
+                    break
+            if not rows:
+                return 0
+            try:
+                APIUsageLog.objects.bulk_create(
+                    [APIUsageLog(**dict(zip(USAGE_FIELDS, row))) for row in rows],
+                    batch_size=self.batch_size,
+                )
+            except Exception:
+                logger.exception("Dropped %d API usage rows", len(rows))
+                return 0
+            finally:
+                close_old_connections()
+            self.written += len(rows)
+            return len(rows)
+
+    def close(self):
+        """Stop the flush thread and write whatever is still queued"""
+        if not self._closed:
+            self._closed = True
+            self._wakeup.set()
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._closed:
+                return
+            self.flush()
+
+
+@lru_cache(maxsize=None)
+def get_usage_buffer():
+    """Return the process-wide usage buffer, flushed again at interpreter exit"""
+    buffer = UsageBuffer(
+        capacity=settings.API_USAGE_LOG_BUFFER_SIZE,
+        batch_size=settings.API_USAGE_LOG_BATCH_SIZE,
+        flush_interval=settings.API_USAGE_LOG_FLUSH_INTERVAL,
+    )
+    atexit.register(buffer.close)
+    return buffer
+
+
+@receiver(setting_changed)
+def _reset_usage_buffer(setting, **kwargs):
+    if setting.startswith('API_USAGE_LOG_') and get_usage_buffer.cache_info().currsize:
+        get_usage_buffer().close()
+        get_usage_buffer.cache_clear()
+
+
+# A forked worker process does not inherit its parent's flush thread
+os.register_at_fork(after_in_child=get_usage_buffer.cache_clear)
+
+
+def client_ip(request):
+    """
+    The first X-Forwarded-For address, or REMOTE_ADDR. None if it is not a
+    valid IP address, which would fail the whole batch insert on PostgreSQL.
+    """
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    value = forwarded_for.split(',')[0].strip() if forwarded_for else request.META.get('REMOTE_ADDR')
+    try:
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        return None
+
+
+class UsageLogMiddleware:
+    """
+    Record method, route, status and timing of authenticated API requests.
+
+    The route pattern (``api/moderate/<int:pk>/``) is stored rather than the
+    path so usage groups by endpoint.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, start)
+        return response
+
+    def record(self, request, response, start):
+        if not settings.API_USAGE_LOG_ENABLED or not request.path.startswith('/api/'):
+            return
+        # DRF and the async views replace the lazy session user with the JWT
+        # user; evaluating the lazy one would cost a session query
+        user = getattr(request, 'user', None)
+        if user is None or isinstance(user, SimpleLazyObject) or not user.is_authenticated:
+            return
+
+        match = request.resolver_match
+        get_usage_buffer().record(
+            user.pk,
+            (match.route if match else request.path)[:100],
+            request.method,
+            response.status_code,
+            int((time.perf_counter() - start) * 1000),
+            client_ip(request),
+            request.META.get('HTTP_USER_AGENT', ''),
+            timezone.now(),
+        )
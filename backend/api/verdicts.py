@@ -0,0 +1,205 @@
+"""
+Verdict cache for repeated moderation inputs.
+
+Identical content (text and URLs as the backend normalizes them, images by
+bytes) is moderated once per ruleset version. Verdicts are kept in a process-local
+LRU in front of the VerdictCacheEntry table; changing the backend or its
+rules changes the version, so older verdicts are simply never read again.
+"""
+import copy
+import hashlib
+from datetime import timedelta
+from functools import lru_cache
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .backends import get_moderation_backend
+from .cache import HitCounter
+from .imageindex import near_duplicate_verdict
+from .lru import LRUCache
+from .models import VerdictCacheEntry
+
+VERDICT_FIELDS = ('result', 'risk_level', 'confidence_score', 'flags_detected')
+
+verdict_counter = HitCounter('verdicts')
+
+
+def file_digest(input_file):
+    """SHA-256 of an uploaded or stored file, leaving it rewound"""
+    digest = hashlib.sha256()
+    input_file.seek(0)
+    for chunk in input_file.chunks():
+        digest.update(chunk)
+    input_file.seek(0)
+    return digest.hexdigest()
+
+
+def content_hash(backend, input_type, input_value, input_file=None):
+    # Only what the backend treats as equal may share a verdict
+    normalized = backend.normalize(input_type, input_value)
+    if input_type == 'image' and input_file:
+        # The caption is judged along with the file. Uploads streamed
+        # through ImageUploadHandler are already digested
+        normalized = f"{getattr(input_file, 'sha256', None) or file_digest(input_file)}\0{normalized}"
+    return hashlib.sha256(f'{input_type}\0{normalized}'.encode()).hexdigest()
+
+
+def ruleset_version(backend):
+    return hashlib.sha256(backend.version.encode()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _local_cache():
+    return LRUCache(settings.MODERATION_VERDICT_CACHE_SIZE, settings.MODERATION_VERDICT_CACHE_TTL)
+
+
+@receiver(setting_changed)
+def _reset_local_cache(setting, **kwargs):
+    if setting.startswith('MODERATION_'):
+        _local_cache.cache_clear()
+
+
+def _stored_verdicts(hashes, version):
+    """Fetch unexpired verdicts for ``hashes`` from the database tier"""
+    cutoff = timezone.now() - timedelta(seconds=settings.MODERATION_VERDICT_CACHE_TTL)
+    entries = VerdictCacheEntry.objects.filter(
+        content_hash__in=hashes, ruleset_version=version, created_at__gte=cutoff
+    ).values('content_hash', *VERDICT_FIELDS)
+    return {entry.pop('content_hash'): entry for entry in entries}
+
+
+def moderate_many(items):
+    """
+    Moderate ``(input_type, input_value, input_file)`` items with the
+    configured backend, reusing cached verdicts for content seen before and
+    for near-duplicates of known unsafe images. Returns one verdict dict per
+    item, in order.
+    """
+    results = [near_duplicate_verdict(*item) for item in items]
+    missing = [index for index, verdict in enumerate(results) if verdict is None]
+    if missing:
+        for index, verdict in zip(missing, _moderate_many([items[index] for index in missing])):
+            results[index] = verdict
+    return results
+
+
+async def amoderate_many(items):
+    """
+    Async ``moderate_many`` for ASGI views. Cache reads and writes run in
+    the sync thread; the backend call itself is awaited, so slow backends
+    do not hold a thread.
+    """
+    if any(item[0] == 'image' for item in items):
+        results = await sync_to_async(lambda: [near_duplicate_verdict(*item) for item in items])()
+    else:
+        results = [None] * len(items)
+    missing = [index for index, verdict in enumerate(results) if verdict is None]
+    if missing:
+        for index, verdict in zip(missing, await _amoderate_many([items[index] for index in missing])):
+            results[index] = verdict
+    return results
+
+
+def _cache_enabled(backend):
+    return settings.MODERATION_VERDICT_CACHE_ENABLED and backend.cacheable
+
+
+def _moderate_many(items):
+    backend = get_moderation_backend()
+    if not _cache_enabled(backend):
+        return backend.moderate_many(items)
+
+    lookup = _lookup(backend, items)
+    pending = [items[index] for index in lookup.first_index.values()]
+    return _store(backend, items, lookup, backend.moderate_many(pending) if pending else [])
+
+
+async def _amoderate_many(items):
+    backend = get_moderation_backend()
+    if not _cache_enabled(backend):
+        return await backend.amoderate_many(items)
+
+    lookup = await sync_to_async(_lookup)(backend, items)
+    pending = [items[index] for index in lookup.first_index.values()]
+    fresh = await backend.amoderate_many(pending) if pending else []
+    return await sync_to_async(_store)(backend, items, lookup, fresh)
+
+
+class _Lookup(NamedTuple):
+    version: str
+    hashes: list
+    # Cached verdicts by content hash
+    verdicts: dict
+    # Content hash -> index of the first item that still needs moderating
+    first_index: dict
+
+
+def _lookup(backend, items):
+    """Find cached verdicts for ``items`` in the local LRU, then the database"""
+    version = ruleset_version(backend)
+    local = _local_cache()
+    hashes = [content_hash(backend, *item) for item in items]
+
+    verdicts = {}
+    for key in set(hashes):
+        verdict = local.get((key, version))
+        if verdict is not None:
+            verdicts[key] = verdict
+
+    missing = set(hashes) - verdicts.keys()
+    if missing:
+        for key, verdict in _stored_verdicts(missing, version).items():
+            local.set((key, version), verdict)
+            verdicts[key] = verdict
+
+    # Moderate each distinct unseen item once, even if repeated in the batch
+    first_index = {}
+    for index, key in enumerate(hashes):
+        if key not in verdicts:
+            first_index.setdefault(key, index)
+    return _Lookup(version, hashes, verdicts, first_index)
+
+
+def _store(backend, items, lookup, fresh_verdicts):
+    """Cache the verdicts of newly moderated items and assemble the results"""
+    version, hashes, verdicts, first_index = lookup
+    local = _local_cache()
+    fresh = dict(zip(first_index, fresh_verdicts))
+    if fresh:
+        VerdictCacheEntry.objects.bulk_create([
+            VerdictCacheEntry(
+                content_hash=key,
+                ruleset_version=version,
+                input_type=items[first_index[key]][0],
+                **{field: verdict[field] for field in VERDICT_FIELDS}
+            )
+            for key, verdict in fresh.items()
+        ], ignore_conflicts=True)
+        for key, verdict in fresh.items():
+            local.set((key, version), copy.deepcopy({field: verdict[field] for field in VERDICT_FIELDS}))
+            verdicts[key] = verdict
+
+    results = []
+    for index, (key, item) in enumerate(zip(hashes, items)):
+        if first_index.get(key) == index:
+            results.append(fresh[key])
+        else:
+            results.append(backend.localize(copy.deepcopy(verdicts[key]), item[1]))
+    verdict_counter.record(False, len(fresh))
+    verdict_counter.record(True, len(items) - len(fresh))
+    return results
+
+
+def moderate(input_type, input_value, input_file=None):
+    """Moderate a single item through the verdict cache"""
+    return moderate_many([(input_type, input_value, input_file)])[0]
+
+
+async def amoderate(input_type, input_value, input_file=None):
+    """Async ``moderate``"""
+    return (await amoderate_many([(input_type, input_value, input_file)]))[0]
@@ -1,22 +1,39 @@
 import time
-import random
-from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Count, Q
 from django.contrib.auth import login
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from . import search, verdicts
+from .archive import ArchivedHistory, get_archived_log
+from .authentication import touch_last_login
+from .cache import ADMIN_SCOPE, get_cache_counters, get_or_compute_dashboard, invalidate_dashboard
+from .exports import CONTENT_TYPES, export_rows, stream_export
+from .images import image_upload_handlers
+from .jobs import enqueue
 from .models import UserProfile, ModerationLog
+from .pagination import ModerationLogCursorPagination
+from .permissions import IsAdminRole
+from .rollups import record_moderation, record_moderations
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer,
-    ModerationRequestSerializer, ModerationLogSerializer, DashboardStatsSerializer
+    ModerationRequestSerializer, ModerationLogSerializer, DashboardStatsSerializer,
+    ModerationHistoryFilterSerializer, LogFormatSerializer, BatchModerationRequestSerializer,
+    BatchItemSerializer, CompactModerationLogSerializer, ModerationModeSerializer,
+    ModerationPollSerializer, ModerationExportSerializer, ModerationSearchSerializer, get_log_serializer_class,
+    sideload_users
 )
+from .stats import get_rollup_stats
+from .tokens import PrincipalRefreshToken
+from .usage import client_ip
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -40,7 +57,7 @@ class UserRegistrationView(generics.CreateAPIView):
         user = serializer.save()
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = PrincipalRefreshToken.for_user(user)
         
         return Response({
             'user': UserProfileSerializer(user).data,
@@ -78,10 +95,14 @@ class UserLoginView(APIView):
         serializer.is_valid(raise_exception=True)
         
         user = serializer.validated_data['user']
-        login(request, user)
+        if settings.AUTH_STATELESS_LOGIN:
+            # Token clients have no use for a session
+            touch_last_login(user)
+        else:
+            login(request, user)
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = PrincipalRefreshToken.for_user(user)
         
         return Response({
             'user': UserProfileSerializer(user).data,
@@ -101,7 +122,9 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     
     def get_object(self):
-        return self.request.user
+        # Not the cached principal, whose role and flags may be seconds old
+        # and would be written back on update
+        return UserProfile.objects.get(pk=self.request.user.pk)
     
     @swagger_auto_schema(
         operation_description="Get current user profile",
@@ -124,100 +147,174 @@ class ContentModerationView(APIView):
     Submit content for moderation analysis
     """
     permission_classes = (permissions.IsAuthenticated,)
+    throttle_scope = 'moderate'
+    
+    def initialize_request(self, request, *args, **kwargs):
+        # Stream image uploads through the bounded-memory pipeline
+        request.upload_handlers = image_upload_handlers(request)
+        return super().initialize_request(request, *args, **kwargs)
     
     @swagger_auto_schema(
-        operation_description="Submit content for moderation",
+        operation_description="Submit content for moderation. With ?mode=async the item is queued and 202 is returned.",
         request_body=ModerationRequestSerializer,
+        query_serializer=ModerationModeSerializer,
         responses={
             200: ModerationLogSerializer,
-            400: 'Invalid request data'
+            202: 'Queued for asynchronous moderation',
+            400: 'Invalid request data',
+            413: 'Image exceeds MODERATION_IMAGE_MAX_BYTES or MODERATION_IMAGE_MAX_PIXELS',
+            429: 'Moderation quota exceeded; see the Retry-After header'
         }
     )
     def post(self, request):
         start_time = time.time()
         
+        options = ModerationModeSerializer(data=request.query_params)
+        options.is_valid(raise_exception=True)
+        
         serializer = ModerationRequestSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         
-        # Create moderation log entry
-        moderation_log = ModerationLog.objects.create(
+        moderation_log = ModerationLog(
             user=request.user,
-            ip_address=self._get_client_ip(request),
+            ip_address=client_ip(request),
             user_agent=request.META.get('HTTP_USER_AGENT', ''),
             **serializer.validated_data
         )
         
-        # Simulate content moderation (placeholder logic)
-        result_data = self._moderate_content(moderation_log)
+        if options.validated_data['mode'] == 'async':
+            # Hand the pending log to the worker pool and let the client poll
+            with transaction.atomic():
+                moderation_log.save()
+                enqueue(moderation_log)
+            return Response({
+                'id': moderation_log.pk,
+                'result': moderation_log.result,
+                'status_url': reverse('moderation_result', args=[moderation_log.pk], request=request),
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        # Run the configured moderation backend before persisting anything
+        result_data = verdicts.moderate(
+            moderation_log.input_type,
+            moderation_log.input_value,
+            moderation_log.input_file,
+        )
+        for field, value in result_data.items():
+            setattr(moderation_log, field, value)
+        moderation_log.processing_time_ms = int((time.time() - start_time) * 1000)
         
-        # Update moderation log with results
-        processing_time = int((time.time() - start_time) * 1000)
-        moderation_log.result = result_data['result']
-        moderation_log.risk_level = result_data['risk_level']
-        moderation_log.confidence_score = result_data['confidence_score']
-        moderation_log.flags_detected = result_data['flags_detected']
-        moderation_log.processing_time_ms = processing_time
-        moderation_log.save()
+        # Write the finished log once
+        with transaction.atomic():
+            moderation_log.save()
+            record_moderation(moderation_log)
         
         return Response(ModerationLogSerializer(moderation_log).data)
+
+
+class BatchModerationView(ContentModerationView):
+    """
+    Submit many text/URL items for moderation in one request
+    """
+    throttle_scope = 'moderate_batch'
     
-    def _get_client_ip(self, request):
-        """Get client IP address"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
-    
-    def _moderate_content(self, moderation_log):
-        """
-        Placeholder content moderation logic
-        In production, this would integrate with AI/ML services
-        """
-        input_type = moderation_log.input_type
-        input_value = moderation_log.input_value.lower() if moderation_log.input_value else ""
-        
-        # Simulate processing delay
-        time.sleep(random.uniform(0.1, 0.5))
-        
-        # Simple rule-based detection for demo
-        unsafe_keywords = [
-            'spam', 'scam', 'fake', 'counterfeit', 'pirated', 'stolen',
-            'illegal', 'fraud', 'phishing', 'malware', 'virus'
-        ]
-        
-        flags_detected = []
-        risk_level = 'low'
+    @swagger_auto_schema(
+        operation_description="Submit up to MODERATION_BATCH_MAX_ITEMS text or URL items for moderation",
+        request_body=BatchModerationRequestSerializer,
+        responses={
+            200: openapi.Response('Per-item results in input order', openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'results': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    'succeeded': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'failed': openapi.Schema(type=openapi.TYPE_INTEGER),
+                }
+            )),
+            400: 'Invalid request data',
+            429: 'Batch quota exceeded; see the Retry-After header'
+        }
+    )
+    def post(self, request):
+        batch = BatchModerationRequestSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        items = batch.validated_data['items']
+        
+        # Validate items individually so one bad item does not fail the batch
+        results = [None] * len(items)
+        valid_items = []
+        for index, item in enumerate(items):
+            item_serializer = BatchItemSerializer(data=item)
+            if item_serializer.is_valid():
+                valid_items.append((index, item_serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': item_serializer.errors}
+        
+        moderation_logs = []
+        if valid_items:
+            start_time = time.time()
+            results_data = verdicts.moderate_many([
+                (data['input_type'], data.get('input_value'), None) for _, data in valid_items
+            ])
+            processing_time = int((time.time() - start_time) * 1000 / len(valid_items))
+            
+            ip_address = client_ip(request)
+            user_agent = request.META.get('HTTP_USER_AGENT', '')
+            moderation_logs = [
+                ModerationLog(
+                    user=request.user,
+                    ip_address=ip_address,
+                    user_agent=user_agent,
+                    processing_time_ms=processing_time,
+                    **data,
+                    **verdict
+                )
+                for (_, data), verdict in zip(valid_items, results_data)
+            ]
+            
+            # bulk_create skips signals, so maintain the rollup and cache here
+            with transaction.atomic():
+                ModerationLog.objects.bulk_create(moderation_logs)
+                record_moderations(moderation_logs)
+            invalidate_dashboard([request.user.pk])
+        
+        for (index, _), moderation_log in zip(valid_items, moderation_logs):
+            results[index] = {
+                'index': index,
+                'status': 'ok',
+                'log': CompactModerationLogSerializer(moderation_log).data,
+            }
         
-        # Check for unsafe content
-        for keyword in unsafe_keywords:
-            if keyword in input_value:
-                flags_detected.append(f"Contains '{keyword}'")
-                risk_level = 'high'
+        return Response({
+            'results': results,
+            'succeeded': len(moderation_logs),
+            'failed': len(items) - len(moderation_logs),
+        })
+
+
+class ModerationResultView(APIView):
+    """
+    Poll the result of a moderation request, optionally waiting for it
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+    
+    @swagger_auto_schema(
+        operation_description="Get a moderation result. Pass ?wait=<seconds> to long-poll while it is pending.",
+        query_serializer=ModerationPollSerializer,
+        responses={200: ModerationLogSerializer, 404: 'Not found'}
+    )
+    def get(self, request, pk):
+        params = ModerationPollSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
         
-        # Determine result based on flags
-        if flags_detected:
-            result = 'unsafe'
-            confidence_score = random.uniform(0.7, 0.95)
-        else:
-            result = 'safe'
-            confidence_score = random.uniform(0.85, 0.99)
-            risk_level = 'low'
+        moderation_log = request.user.moderation_logs.filter(pk=pk).first() or get_archived_log(request.user, pk)
+        if moderation_log is None:
+            raise Http404
         
-        # Add some randomness for demo purposes
-        if random.random() < 0.1:  # 10% chance of unsafe even if no keywords
-            result = 'unsafe'
-            risk_level = random.choice(['medium', 'high'])
-            flags_detected.append("Suspicious patterns detected")
-            confidence_score = random.uniform(0.6, 0.8)
+        deadline = time.monotonic() + params.validated_data['wait']
+        while moderation_log.is_pending and time.monotonic() < deadline:
+            time.sleep(settings.MODERATION_LONG_POLL_INTERVAL)
+            moderation_log.refresh_from_db()
         
-        return {
-            'result': result,
-            'risk_level': risk_level,
-            'confidence_score': round(confidence_score, 3),
-            'flags_detected': flags_detected
-        }
+        return Response(ModerationLogSerializer(moderation_log).data)
 
 
 class DashboardView(APIView):
@@ -228,131 +325,76 @@ class DashboardView(APIView):
     
     @swagger_auto_schema(
         operation_description="Get user dashboard analytics",
+        query_serializer=LogFormatSerializer,
         responses={200: DashboardStatsSerializer}
     )
     def get(self, request):
         user = request.user
+        params = LogFormatSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        user_format = params.validated_data['user_format']
         
         if user.is_admin:
             # Admin sees aggregated stats for all users
-            stats = self._get_admin_stats()
+            stats, hit = get_or_compute_dashboard(
+                ADMIN_SCOPE, user_format, lambda: self._get_admin_stats(user_format)
+            )
         else:
             # Regular users see their own stats
-            stats = self._get_user_stats(user)
+            stats, hit = get_or_compute_dashboard(
+                user.pk, user_format, lambda: self._get_user_stats(user, user_format)
+            )
         
-        return Response(stats)
+        if user.is_admin:
+            # Live counters, never served from the cached payload
+            stats = {**stats, 'verdict_cache': verdicts.verdict_counter.get()}
+        
+        response = Response(stats)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
     
-    def _get_user_stats(self, user):
+    def _get_user_stats(self, user, user_format='full'):
         """Get statistics for a specific user"""
-        now = timezone.now()
-        today = now.date()
-        week_ago = now - timedelta(days=7)
-        month_ago = now - timedelta(days=30)
-        
-        # Base queryset for user's logs
-        user_logs = user.moderation_logs.all()
-        
-        # Total counts
-        total_checks = user_logs.count()
-        safe_count = user_logs.filter(result='safe').count()
-        unsafe_count = user_logs.filter(result='unsafe').count()
-        pending_count = user_logs.filter(result='pending').count()
-        
-        # Time-based counts
-        checks_today = user_logs.filter(created_at__date=today).count()
-        checks_this_week = user_logs.filter(created_at__gte=week_ago).count()
-        checks_this_month = user_logs.filter(created_at__gte=month_ago).count()
-        
-        # Calculate safety rate
-        safety_rate = (safe_count / total_checks * 100) if total_checks > 0 else 0
-        
-        # Risk breakdown
-        risk_breakdown = dict(
-            user_logs.exclude(risk_level__isnull=True)
-            .values('risk_level')
-            .annotate(count=Count('id'))
-            .values_list('risk_level', 'count')
-        )
-        
-        # Type breakdown
-        type_breakdown = dict(
-            user_logs.values('input_type')
-            .annotate(count=Count('id'))
-            .values_list('input_type', 'count')
-        )
-        
-        # Recent logs (last 10)
-        recent_logs = user_logs[:10]
-        
-        return {
-            'total_checks': total_checks,
-            'safe_count': safe_count,
-            'unsafe_count': unsafe_count,
-            'pending_count': pending_count,
-            'safety_rate': round(safety_rate, 2),
-            'checks_today': checks_today,
-            'checks_this_week': checks_this_week,
-            'checks_this_month': checks_this_month,
-            'recent_logs': ModerationLogSerializer(recent_logs, many=True).data,
-            'risk_breakdown': risk_breakdown,
-            'type_breakdown': type_breakdown,
-        }
+        return self._get_stats(get_rollup_stats(user), user.moderation_logs.all(), user_format)
     
-    def _get_admin_stats(self):
+    def _get_admin_stats(self, user_format='full'):
         """Get aggregated statistics for all users (admin view)"""
-        now = timezone.now()
-        today = now.date()
-        week_ago = now - timedelta(days=7)
-        month_ago = now - timedelta(days=30)
-        
-        # Base queryset for all logs
-        all_logs = ModerationLog.objects.all()
-        
-        # Total counts
-        total_checks = all_logs.count()
-        safe_count = all_logs.filter(result='safe').count()
-        unsafe_count = all_logs.filter(result='unsafe').count()
-        pending_count = all_logs.filter(result='pending').count()
-        
-        # Time-based counts
-        checks_today = all_logs.filter(created_at__date=today).count()
-        checks_this_week = all_logs.filter(created_at__gte=week_ago).count()
-        checks_this_month = all_logs.filter(created_at__gte=month_ago).count()
-        
-        # Calculate safety rate
-        safety_rate = (safe_count / total_checks * 100) if total_checks > 0 else 0
-        
-        # Risk breakdown
-        risk_breakdown = dict(
-            all_logs.exclude(risk_level__isnull=True)
-            .values('risk_level')
-            .annotate(count=Count('id'))
-            .values_list('risk_level', 'count')
-        )
-        
-        # Type breakdown
-        type_breakdown = dict(
-            all_logs.values('input_type')
-            .annotate(count=Count('id'))
-            .values_list('input_type', 'count')
-        )
+        return self._get_stats(get_rollup_stats(), ModerationLog.objects.all(), user_format)
+    
+    def _get_stats(self, stats, logs, user_format):
+        """Attach the recent logs to the rollup figures"""
+        if user_format == 'full':
+            logs = logs.select_related('user')
         
         # Recent logs (last 10)
-        recent_logs = all_logs[:10]
+        recent_logs = list(logs[:10])
+        serializer_class = get_log_serializer_class(user_format)
+        stats['recent_logs'] = serializer_class(recent_logs, many=True).data
+        if user_format == 'sideload':
+            stats['users'] = sideload_users(recent_logs)
         
-        return {
-            'total_checks': total_checks,
-            'safe_count': safe_count,
-            'unsafe_count': unsafe_count,
-            'pending_count': pending_count,
-            'safety_rate': round(safety_rate, 2),
-            'checks_today': checks_today,
-            'checks_this_week': checks_this_week,
-            'checks_this_month': checks_this_month,
-            'recent_logs': ModerationLogSerializer(recent_logs, many=True).data,
-            'risk_breakdown': risk_breakdown,
-            'type_breakdown': type_breakdown,
-        }
+        return stats
+
+
+class DashboardCacheStatsView(APIView):
+    """
+    Dashboard cache hit/miss counters (admin only)
+    """
+    permission_classes = (IsAdminRole,)
+    
+    @swagger_auto_schema(
+        operation_description="Get dashboard cache hit/miss counters",
+        responses={200: openapi.Response('Cache counters', openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'hits': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'misses': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'hit_rate': openapi.Schema(type=openapi.TYPE_NUMBER),
+            }
+        ))}
+    )
+    def get(self, request):
+        return Response(get_cache_counters())
 
 
 class ModerationHistoryView(generics.ListAPIView):
@@ -361,16 +403,112 @@ class ModerationHistoryView(generics.ListAPIView):
     """
     serializer_class = ModerationLogSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = ModerationLogCursorPagination
+    filter_serializer_class = ModerationHistoryFilterSerializer
+    
+    def _get_params(self):
+        if not hasattr(self, '_params'):
+            filters = self.filter_serializer_class(data=self.request.query_params)
+            filters.is_valid(raise_exception=True)
+            self._params = filters.validated_data
+        return self._params
+    
+    def get_serializer_class(self):
+        return get_log_serializer_class(self._get_params()['user_format'])
     
     def get_queryset(self):
-        return self.request.user.moderation_logs.all()
+        params = self._get_params()
+        logs = self.request.user.moderation_logs.all()
+        for field in ('result', 'input_type', 'risk_level'):
+            if field in params:
+                logs = logs.filter(**{field: params[field]})
+        if 'created_after' in params:
+            logs = logs.filter(created_at__gte=params['created_after'])
+        if 'created_before' in params:
+            logs = logs.filter(created_at__lt=params['created_before'])
+        return logs
+    
+    def get_archived_history(self):
+        return ArchivedHistory(self.request.user, self._get_params())
     
     @swagger_auto_schema(
-        operation_description="Get user's moderation history",
+        operation_description="Get user's moderation history, newest first, with cursor pagination",
+        query_serializer=ModerationHistoryFilterSerializer,
         responses={200: ModerationLogSerializer(many=True)}
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self._get_params()['user_format'] == 'sideload':
+            # Every log here belongs to the requesting user
+            response.data['users'] = [UserProfileSerializer(request.user).data]
+        return response
+
+
+class ModerationExportView(ModerationHistoryView):
+    """
+    Stream the current user's full moderation history as CSV or JSONL
+    """
+    pagination_class = None
+    filter_serializer_class = ModerationExportSerializer
+    throttle_scope = 'export'
+    
+    @swagger_auto_schema(
+        operation_description="Download the user's moderation history, newest first, including archived logs",
+        query_serializer=ModerationExportSerializer,
+        responses={200: 'CSV or JSONL file', 429: 'Export quota exceeded'}
+    )
+    def get(self, request, *args, **kwargs):
+        params = self._get_params()
+        export_format = params['export_format']
+        rows = export_rows(
+            self.get_queryset(), self.get_archived_history(), settings.MODERATION_EXPORT_CHUNK_SIZE
+        )
+        
+        filename = f'moderation-history-{timezone.localdate():%Y-%m-%d}.{export_format}'
+        if params['gzip']:
+            filename += '.gz'
+        response = StreamingHttpResponse(
+            stream_export(rows, export_format, gzip=params['gzip']),
+            content_type='application/gzip' if params['gzip'] else CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ModerationSearchView(APIView):
+    """
+    Full-text search over moderation content and notes, best match first
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+    
+    @swagger_auto_schema(
+        operation_description="Search moderation logs by content; users see their own logs, admins everyone's",
+        query_serializer=ModerationSearchSerializer,
+        responses={200: openapi.Response('Ranked logs, each with rank and an HTML highlight snippet')}
+    )
+    def get(self, request):
+        params = ModerationSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+        user_format = params['user_format']
+        
+        user_id = params.get('user_id') if request.user.is_admin else request.user.pk
+        logs = ModerationLog.objects.all()
+        if user_format == 'full':
+            logs = logs.select_related('user')
+        logs = search.search(params['q'], user_id, params['limit'], params['offset'], queryset=logs)
+        
+        results = get_log_serializer_class(user_format)(logs, many=True).data
+        for result, log in zip(results, logs):
+            result['rank'] = log.rank
+            result['highlight'] = log.highlight
+        data = {'results': results}
+        if user_format == 'sideload':
+            data['users'] = sideload_users(logs)
+        return Response(data)
 
 
 @api_view(['GET'])
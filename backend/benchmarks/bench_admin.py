@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Changelist benchmark for the ModerationLog admin
+Renders the first page of the admin list, unfiltered and filtered, as the
+admin is configured and as it was before (date hierarchy, exact COUNT(*)s,
+no joined users), at growing table sizes.
+
+Usage: python bench_admin.py [rows ...]
+"""
+
+import sys
+import time
+
+import common
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from api.admin import ModerationLogAdmin
+from api.models import ModerationLog, UserProfile
+
+
+class PlainModerationLogAdmin(admin.ModelAdmin):
+    list_display = ModerationLogAdmin.list_display
+    list_filter = ModerationLogAdmin.list_filter
+    search_fields = ('user__username', 'user__email', 'input_value', 'notes')
+    date_hierarchy = 'created_at'
+
+
+def seed(users, rows):
+    ModerationLog.objects.bulk_create(
+        [
+            ModerationLog(user=users[i % len(users)], input_type='text', input_value=f'post {i}',
+                          result='unsafe' if i % 7 == 0 else 'safe')
+            for i in range(rows)
+        ],
+        batch_size=5000,
+    )
+
+
+def render(model_admin, staff, params):
+    request = RequestFactory().get('/admin/api/moderationlog/', params)
+    request.user = staff
+    start = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        model_admin.changelist_view(request).render()
+    return (time.perf_counter() - start) * 1000, len(queries)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000]
+
+    with common.test_database():
+        staff = UserProfile.objects.create_superuser(username='root', password='benchpass123!', email='root@example.com')
+        users = [common.create_user(f'creator{i}') for i in range(50)]
+        admins = [
+            ('before', PlainModerationLogAdmin(ModerationLog, admin.site)),
+            ('log table admin', ModerationLogAdmin(ModerationLog, admin.site)),
+        ]
+
+        print(f"{'rows':>8} {'admin':<16} {'filter':<14} {'ms':>9} {'queries':>8}")
+        seeded = 0
+        for rows in sizes:
+            seed(users, rows - seeded)
+            seeded = rows
+            cache.clear()
+            for name, model_admin in admins:
+                for label, params in (('none', {}), ('result=unsafe', {'result__exact': 'unsafe'})):
+                    render(model_admin, staff, params)  # warm the count cache
+                    elapsed, queries = render(model_admin, staff, params)
+                    print(f"{rows:>8} {name:<16} {label:<14} {elapsed:>9.1f} {queries:>8}")
+
+
+if __name__ == '__main__':
+    main()
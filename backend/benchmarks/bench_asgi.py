@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Concurrency benchmark for POST /api/moderate/ under WSGI and ASGI
+Sends requests from many concurrent clients against SimulatedLatencyBackend,
+once through the WSGI handler with a fixed pool of worker threads and once
+through the ASGI handler with the native async views, each in a fresh process.
+
+Usage: python bench_asgi.py [clients] [requests_per_client]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+LATENCY_MS = 300
+WSGI_THREADS = 16
+PAYLOAD = {'input_type': 'text', 'input_value': 'Limited offer, totally not a scam!'}
+
+
+def percentile(samples, share):
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * share), len(samples) - 1)] * 1000
+
+
+def run_wsgi(headers, clients, per_client):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.test import Client
+
+    # A WSGI server answers one request per worker thread; the rest queue
+    workers = threading.BoundedSemaphore(WSGI_THREADS)
+
+    def client(_):
+        session = Client(headers=headers)
+        latencies = []
+        for _ in range(per_client):
+            start = time.perf_counter()
+            with workers:
+                response = session.post('/api/moderate/', PAYLOAD, content_type='application/json')
+            assert response.status_code == 200, response.content
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    with ThreadPoolExecutor(clients) as pool:
+        return [latency for latencies in pool.map(client, range(clients)) for latency in latencies]
+
+
+def run_asgi(headers, clients, per_client):
+    import asyncio
+
+    from django.test import AsyncClient
+
+    async def client():
+        session = AsyncClient()
+        latencies = []
+        for _ in range(per_client):
+            start = time.perf_counter()
+            response = await session.post('/api/moderate/', PAYLOAD, content_type='application/json', headers=headers)
+            assert response.status_code == 200, response.content
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    async def main():
+        results = await asyncio.gather(*(client() for _ in range(clients)))
+        return [latency for latencies in results for latency in latencies]
+
+    return asyncio.run(main())
+
+
+def run_child(mode, clients, per_client):
+    os.environ['MODERATION_BACKEND'] = 'api.backends.SimulatedLatencyBackend'
+    os.environ['MODERATION_SIMULATED_LATENCY_MS'] = f'{LATENCY_MS},{LATENCY_MS}'
+    os.environ['ASYNC_API_VIEWS'] = str(mode == 'asgi')
+
+    import tempfile
+
+    import common
+
+    from django.db import connection
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    # Worker threads need a file database; the in-memory test database
+    # locks whole tables between connections
+    workdir = tempfile.TemporaryDirectory()
+    connection.settings_dict['TEST']['NAME'] = os.path.join(workdir.name, 'bench.sqlite3')
+
+    with workdir, common.test_database():
+        user = common.create_user()
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+        run = run_asgi if mode == 'asgi' else run_wsgi
+
+        start = time.perf_counter()
+        latencies = run(headers, clients, per_client)
+        elapsed = time.perf_counter() - start
+
+    print(len(latencies) / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99))
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    print(f"{clients} clients x {per_client} requests, {LATENCY_MS}ms backend latency")
+    print(f"{'server':<24} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, label in [('wsgi', f'WSGI ({WSGI_THREADS} threads)'), ('asgi', 'ASGI (async views)')]:
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', mode, str(clients), str(per_client)],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        throughput, p50, p99 = map(float, output)
+        print(f"{label:<24} {throughput:>9.1f} {p50:>9.1f} {p99:>9.1f}")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        run_child(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
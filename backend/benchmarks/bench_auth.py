@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Per-request authentication overhead benchmark
+Authenticates the same bearer token repeatedly with simplejwt's
+JWTAuthentication, which loads the user from the database each time, and
+with CachedJWTAuthentication through the principal cache and with trusted
+role claims.
+
+Usage: python bench_auth.py [requests]
+"""
+
+import sys
+import time
+
+import common
+
+from django.test import RequestFactory, override_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api.authentication import CachedJWTAuthentication
+from api.tokens import PrincipalRefreshToken
+
+
+def per_request_us(authentication, request, requests):
+    authentication.authenticate(request)  # warm up
+    start = time.perf_counter()
+    for _ in range(requests):
+        authentication.authenticate(request)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    with common.test_database():
+        user = common.create_user()
+        token = PrincipalRefreshToken.for_user(user).access_token
+        request = RequestFactory().get('/api/dashboard/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        print(f"{'authentication':<36} {'requests':>9} {'µs/request':>11}")
+        for name, authentication, settings in (
+            ('JWTAuthentication (query per call)', JWTAuthentication(), {}),
+            ('cached principal', CachedJWTAuthentication(), {}),
+            ('cached, process LRU disabled', CachedJWTAuthentication(), {'JWT_USER_CACHE_LOCAL_TTL': 0}),
+            ('trusted role claims', CachedJWTAuthentication(), {'JWT_TRUST_ROLE_CLAIM': True}),
+        ):
+            with override_settings(**settings):
+                print(f"{name:<36} {requests:>9} {per_request_us(authentication, request, requests):>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Benchmark dashboard statistics on a large ModerationLog table
+Compares the previous one-query-per-counter approach with the
+ModerationDailyStat rollup the dashboard reads.
+
+Usage: python benchmarks/bench_dashboard.py [rows]   (default 5,000,000)
+"""
+
+import io
+import random
+import sys
+import time
+from datetime import timedelta
+
+import common
+
+from django.core.management import call_command
+
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.models import ModerationLog
+from api.stats import get_rollup_stats
+
+BATCH_SIZE = 10_000
+
+
+def seed(users, rows):
+    rng = random.Random(42)
+    now = timezone.now()
+    input_types = [choice for choice, _ in ModerationLog.INPUT_TYPES]
+    results = [choice for choice, _ in ModerationLog.RESULT_TYPES]
+    risk_levels = [choice for choice, _ in ModerationLog.RISK_LEVELS] + [None]
+
+    created = 0
+    while created < rows:
+        batch = [
+            ModerationLog(
+                user=rng.choice(users),
+                input_type=rng.choice(input_types),
+                input_value='benchmark content',
+                result=rng.choice(results),
+                risk_level=rng.choice(risk_levels),
+            )
+            for _ in range(min(BATCH_SIZE, rows - created))
+        ]
+        ModerationLog.objects.bulk_create(batch)
+        created += len(batch)
+
+    # Spread created_at over the last 180 days
+    with connection.cursor() as cursor:
+        for offset in range(180):
+            cursor.execute(
+                f'UPDATE {ModerationLog._meta.db_table} SET created_at = %s WHERE id %% 180 = %s',
+                [now - timedelta(days=offset), offset]
+            )
+
+
+def legacy_stats(logs):
+    """The previous per-counter implementation"""
+    now = timezone.now()
+    total_checks = logs.count()
+    safe_count = logs.filter(result='safe').count()
+    logs.filter(result='unsafe').count()
+    logs.filter(result='pending').count()
+    logs.filter(created_at__date=now.date()).count()
+    logs.filter(created_at__gte=now - timedelta(days=7)).count()
+    logs.filter(created_at__gte=now - timedelta(days=30)).count()
+    dict(logs.exclude(risk_level__isnull=True).values('risk_level').annotate(count=Count('id')).values_list('risk_level', 'count'))
+    dict(logs.values('input_type').annotate(count=Count('id')).values_list('input_type', 'count'))
+    return safe_count / total_checks * 100 if total_checks else 0
+
+
+def measure(func):
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    return len(queries), elapsed * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+    with common.test_database():
+        users = [common.create_user(f'bench{i}') for i in range(10)]
+        print(f'Seeding {rows:,} moderation logs...')
+        seed(users, rows)
+        call_command('reconcile_moderation_stats', stdout=io.StringIO())
+
+        print(f"{'scope':<8} {'implementation':<16} {'queries':>8} {'ms':>10}")
+        for scope, user in [('admin', None), ('user', users[0])]:
+            logs = user.moderation_logs.all() if user else ModerationLog.objects.all()
+            for name, func in [
+                ('legacy', lambda: legacy_stats(logs)),
+                ('rollup', lambda: get_rollup_stats(user)),
+            ]:
+                queries, elapsed = measure(func)
+                print(f'{scope:<8} {name:<16} {queries:>8} {elapsed:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
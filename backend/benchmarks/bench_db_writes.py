@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Concurrent write benchmark for the database configuration
+Worker threads each run simulated requests that save a moderation log and
+bump its rollup bucket in one transaction, the write ContentModerationView
+makes, while reader threads page through history. Each profile runs in a
+fresh process with its DB_* environment applied:
+
+  sqlite-default  rollback journal, synchronous=FULL, deferred transactions
+  sqlite-tuned    the shipped settings: WAL, synchronous=NORMAL, IMMEDIATE
+  postgresql      persistent connections (only when DB_ENGINE=postgresql)
+  postgresql-pool psycopg connection pool (only when DB_ENGINE=postgresql)
+
+Usage: python bench_db_writes.py [writers] [requests_per_writer] [readers]
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+PROFILES = {
+    'sqlite-default': {
+        'DB_ENGINE': 'sqlite', 'DB_SQLITE_JOURNAL_MODE': 'DELETE', 'DB_SQLITE_SYNCHRONOUS': 'FULL',
+        'DB_SQLITE_TRANSACTION_MODE': 'DEFERRED', 'DB_BUSY_TIMEOUT': '5', 'DB_CONN_MAX_AGE': '0',
+    },
+    'sqlite-tuned': {'DB_ENGINE': 'sqlite'},
+    'postgresql': {'DB_ENGINE': 'postgresql', 'DB_POOL': 'False'},
+    'postgresql-pool': {'DB_ENGINE': 'postgresql', 'DB_POOL': 'True'},
+}
+
+
+def run_child(writers, per_writer, readers):
+    import tempfile
+
+    import common
+
+    from django.db import OperationalError, close_old_connections, connection, transaction
+
+    from api.models import ModerationLog
+    from api.rollups import record_moderation
+
+    def request(work):
+        # What Django's request_started/request_finished handlers do
+        close_old_connections()
+        try:
+            return work()
+        finally:
+            close_old_connections()
+
+    def write(user):
+        with transaction.atomic():
+            log = ModerationLog.objects.create(
+                user=user, input_type='text', input_value='Limited offer, totally not a scam!',
+                result='unsafe', risk_level='high', confidence_score=0.8, flags_detected=['scam'],
+                processing_time_ms=3,
+            )
+            record_moderation(log)
+
+    def read(user):
+        list(ModerationLog.objects.filter(user=user).order_by('-created_at', '-id')[:20])
+
+    def worker(work, user, counts, stop=None):
+        try:
+            while stop is None or not stop.is_set():
+                try:
+                    start = time.perf_counter()
+                    request(lambda: work(user))
+                    counts['latencies'].append(time.perf_counter() - start)
+                except OperationalError:
+                    counts['errors'] += 1
+                if stop is None and len(counts['latencies']) + counts['errors'] >= per_writer:
+                    return
+        finally:
+            connection.close()
+
+    workdir = tempfile.TemporaryDirectory()
+    if connection.vendor == 'sqlite':
+        # Threads need a shared file database, not the in-memory test one
+        connection.settings_dict['TEST']['NAME'] = os.path.join(workdir.name, 'bench.sqlite3')
+
+    with workdir, common.test_database():
+        users = [common.create_user(f'writer{index}') for index in range(writers)]
+        connection.close()
+
+        stop = threading.Event()
+        write_counts = [{'latencies': [], 'errors': 0} for _ in users]
+        read_counts = [{'latencies': [], 'errors': 0} for _ in range(readers)]
+        threads = [
+            threading.Thread(target=worker, args=(write, user, counts))
+            for user, counts in zip(users, write_counts)
+        ]
+        reader_threads = [
+            threading.Thread(target=worker, args=(read, users[index % writers], counts, stop))
+            for index, counts in enumerate(read_counts)
+        ]
+
+        start = time.perf_counter()
+        for thread in threads + reader_threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for thread in reader_threads:
+            thread.join()
+
+    latencies = sorted(latency for counts in write_counts for latency in counts['latencies'])
+    reads = sum(len(counts['latencies']) for counts in read_counts)
+    errors = sum(counts['errors'] for counts in write_counts + read_counts)
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000 if latencies else 0
+    print(len(latencies) / elapsed, reads / elapsed, p99, errors)
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_writer = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    profiles = [
+        name for name in PROFILES
+        if os.environ.get('DB_ENGINE', 'sqlite') == 'postgresql' or name.startswith('sqlite')
+    ]
+    print(f"{writers} writers x {per_writer} requests, {readers} readers")
+    print(f"{'profile':<16} {'writes/s':>9} {'reads/s':>9} {'write p99 ms':>13} {'errors':>7}")
+    for name in profiles:
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', str(writers), str(per_writer), str(readers)],
+            env={**os.environ, **PROFILES[name]}, check=True, capture_output=True, text=True,
+        ).stdout.split()
+        writes, reads, p99, errors = output
+        print(f"{name:<16} {float(writes):>9.1f} {float(reads):>9.1f} {float(p99):>13.1f} {int(errors):>7}")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        run_child(int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Memory benchmark for the moderation history export
+Seeds one user with growing numbers of logs and compares peak Python memory
+and time to first byte of the streaming export against materialising the
+whole history through the serializer and writing it out in one go. The
+same rows are then moved into a month's archive segment and exported again,
+so the archive is read as the export streams rather than up front.
+
+Usage: python bench_export.py [rows ...]
+"""
+
+import csv
+import io
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+import common
+
+from django.test import override_settings
+from django.utils import timezone
+
+from api import archive
+from api.exports import export_rows, stream_export
+from api.models import ModerationArchive, ModerationLog
+from api.serializers import CompactModerationLogSerializer
+
+
+def seed(user, rows):
+    ModerationLog.objects.filter(user=user).delete()
+    ModerationLog.objects.bulk_create(
+        [
+            ModerationLog(
+                user=user, input_type='text', input_value=f'sponsored post number {i} ' * 4,
+                result='safe', risk_level='low', confidence_score=0.9, flags_detected=[],
+            )
+            for i in range(rows)
+        ],
+        batch_size=2000,
+    )
+
+
+def archive_seeded(user):
+    # Move every log into one segment for the month before last
+    month = (timezone.now().replace(day=1) - timedelta(days=40)).replace(day=1, hour=12)
+    ModerationArchive.objects.all().delete()
+    ModerationLog.objects.filter(user=user).update(created_at=month)
+    archive.archive_logs(month + timedelta(days=1))
+
+
+def materialised(user):
+    data = CompactModerationLogSerializer(user.moderation_logs.all(), many=True).data
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(data[0]))
+    writer.writeheader()
+    writer.writerows(data)
+    yield buffer.getvalue().encode()
+
+
+def streamed(user):
+    return stream_export(export_rows(user.moderation_logs.all()), 'csv')
+
+
+def archived(user):
+    return stream_export(export_rows(user.moderation_logs.all(), archive.ArchivedHistory(user)), 'csv')
+
+
+def measure(body):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in body:
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024, first_byte * 1000, total, size / 1024 / 1024
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 50_000]
+
+    with common.test_database(), tempfile.TemporaryDirectory() as archive_dir, \
+            override_settings(MODERATION_ARCHIVE_DIR=archive_dir):
+        user = common.create_user()
+        print(f"{'mode':<14} {'rows':>8} {'MiB out':>8} {'peak MiB':>9} {'first byte ms':>14} {'total s':>8}")
+        for rows in sizes:
+            seed(user, rows)
+            for name, export in (('materialised', materialised), ('streamed', streamed)):
+                peak, first_byte, total, size = measure(export(user))
+                print(f"{name:<14} {rows:>8} {size:>8.1f} {peak:>9.1f} {first_byte:>14.1f} {total:>8.2f}")
+            archive_seeded(user)
+            peak, first_byte, total, size = measure(archived(user))
+            print(f"{'archived':<14} {rows:>8} {size:>8.1f} {peak:>9.1f} {first_byte:>14.1f} {total:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Lookup benchmark for the near-duplicate image index
+Compares multi-index hash searches with a linear scan over the same perceptual
+hashes, for queries that have a near-duplicate and queries that do not.
+
+Usage: python bench_image_index.py [max_hashes]
+"""
+
+import random
+import sys
+import time
+
+import common  # noqa: F401  (configures Django)
+
+from django.conf import settings
+
+from api.imageindex import MultiIndexHash, hamming
+
+QUERIES = 1000
+
+
+def linear_scan(keys, query, radius):
+    return [(hamming(query, key), value) for value, key in enumerate(keys) if hamming(query, key) <= radius]
+
+
+def per_query_us(search, queries):
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - start) / len(queries) * 1_000_000
+
+
+def main():
+    max_hashes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    radius = settings.MODERATION_PHASH_MAX_DISTANCE
+    rng = random.Random(0)
+
+    print(f"radius {radius}")
+    print(f"{'hashes':>10} {'build s':>8} {'near-dup µs':>12} {'no match µs':>12} {'linear µs':>12}")
+    size = 10_000
+    while size <= max_hashes:
+        keys = [rng.getrandbits(64) for _ in range(size)]
+        start = time.perf_counter()
+        table = MultiIndexHash()
+        for value, key in enumerate(keys):
+            table.add(key, value)
+        build = time.perf_counter() - start
+
+        near = [rng.choice(keys) ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for _ in range(QUERIES)]
+        unrelated = [rng.getrandbits(64) for _ in range(QUERIES)]
+        table_near = per_query_us(lambda query: table.search(query, radius), near)
+        table_miss = per_query_us(lambda query: table.search(query, radius), unrelated)
+        linear = per_query_us(lambda query: linear_scan(keys, query, radius), unrelated[:10])
+
+        print(f"{size:>10,} {build:>8.2f} {table_near:>12.1f} {table_miss:>12.1f} {linear:>12.1f}")
+        size *= 10
+
+
+if __name__ == '__main__':
+    main()
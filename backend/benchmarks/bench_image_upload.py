@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Peak memory benchmark for image uploads to POST /api/moderate/
+Each upload runs in a fresh process and reports how far the peak RSS grew
+while handling the request, with Django's default upload handlers and with
+the streaming image pipeline. Request bodies are streamed from disk, as a
+WSGI server would, so the client side adds nothing to the measurement.
+
+Usage: python bench_image_upload.py
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+SIZES_MB = [1, 20, 100]
+MODES = ['default', 'streaming']
+BOUNDARY = 'BenchBoundary'
+
+
+def write_request_body(path, size_mb):
+    """Write a multipart body holding a JPEG padded to ``size_mb``"""
+    from io import BytesIO
+
+    from PIL import Image
+
+    width, height = (800, 600) if size_mb < 10 else (3000, 2000)
+    image = Image.merge('RGB', [Image.effect_noise((width, height), 64)] * 3)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    jpeg = buffer.getvalue()
+    # Decoders ignore bytes after the end-of-image marker
+    padding = max(size_mb * 1024 * 1024 - len(jpeg), 0)
+
+    with open(path, 'wb') as body:
+        for name, value in [('input_type', 'image'), ('input_value', 'photo.jpg')]:
+            body.write(
+                f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            )
+        body.write(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="input_file"; filename="photo.jpg"\r\n'
+            'Content-Type: image/jpeg\r\n\r\n'.encode()
+        )
+        body.write(jpeg)
+        chunk = b'\0' * (1024 * 1024)
+        while padding:
+            body.write(chunk[:padding])
+            padding -= min(padding, len(chunk))
+        body.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+
+
+def run_child(mode, body_path):
+    import common
+
+    from django.conf import settings
+    from django.core.files.uploadhandler import load_handler
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api import views
+
+    if mode == 'default':
+        views.image_upload_handlers = lambda request: [
+            load_handler(handler, request) for handler in settings.FILE_UPLOAD_HANDLERS
+        ]
+
+    with common.test_database(), tempfile.TemporaryDirectory() as media_root:
+        user = common.create_user()
+        handler = WSGIHandler()
+        size = os.path.getsize(body_path)
+        statuses = []
+
+        with override_settings(MEDIA_ROOT=media_root), open(body_path, 'rb') as body:
+            environ = {
+                'REQUEST_METHOD': 'POST',
+                'PATH_INFO': '/api/moderate/',
+                'SERVER_NAME': 'testserver',
+                'SERVER_PORT': '80',
+                'HTTP_HOST': 'testserver',
+                'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}',
+                'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}',
+                'CONTENT_LENGTH': str(size),
+                'wsgi.input': body,
+                'wsgi.url_scheme': 'http',
+            }
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            b''.join(handler(environ, lambda status, headers: statuses.append(status)))
+            after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(statuses[0].split()[0], (after - before) / 1024)
+
+
+def main():
+    print(f"{'upload':>8} {'handlers':<10} {'status':>7} {'peak RSS growth MB':>19}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size_mb in SIZES_MB:
+            body_path = os.path.join(workdir, f'{size_mb}mb.body')
+            write_request_body(body_path, size_mb)
+            for mode in MODES:
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', mode, body_path],
+                    check=True, capture_output=True, text=True,
+                ).stdout.split()
+                print(f"{size_mb:>6}MB {mode:<10} {output[0]:>7} {float(output[1]):>19.1f}")
+            os.remove(body_path)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        run_child(sys.argv[2], sys.argv[3])
+    else:
+        main()
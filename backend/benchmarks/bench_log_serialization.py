@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+Benchmark moderation history response size and serialization time per
+page for each user_format
+"""
+
+import time
+
+import common
+
+from api.models import ModerationLog
+
+LOGS = 2_000
+PAGE_SIZE = 100
+REPEAT = 20
+
+
+def main():
+    with common.test_database():
+        user = common.create_user()
+        ModerationLog.objects.bulk_create([
+            ModerationLog(user=user, input_type='text', input_value=f'caption {index}', result='safe')
+            for index in range(LOGS)
+        ])
+        client = common.authenticated_client(user)
+
+        print(f"{'user_format':<12} {'bytes/page':>11} {'ms/page':>9}")
+        for user_format in ('full', 'id', 'sideload'):
+            url = f'/api/history/?page_size={PAGE_SIZE}&user_format={user_format}'
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                response = client.get(url)
+            elapsed = (time.perf_counter() - start) / REPEAT * 1000
+            print(f'{user_format:<12} {len(response.content):>11} {elapsed:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Login burst benchmark
+Signs many users in at once from concurrent threads through
+POST /api/auth/login/, with session logins and with stateless token logins,
+and reports logins per second for a first and a repeat sign-in. Password
+hashing dominates with the default PBKDF2 hasher, so each mode also runs
+with a fast hasher to show what the session and last_login writes cost.
+
+Usage: python bench_login.py [users] [threads]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import common
+
+from django.db import connection
+from django.test import Client, override_settings
+
+PASSWORD = 'benchpass123!'
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def burst(usernames, threads):
+    def sign_in(username):
+        try:
+            response = Client().post(
+                '/api/auth/login/', {'username': username, 'password': PASSWORD}, content_type='application/json'
+            )
+            assert response.status_code == 200, response.content
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(sign_in, usernames))
+    return len(usernames) / (time.perf_counter() - start)
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    # Threads need a shared file database, not the in-memory test one
+    workdir = tempfile.TemporaryDirectory()
+    connection.settings_dict['TEST']['NAME'] = os.path.join(workdir.name, 'bench.sqlite3')
+
+    print(f"{users} users signing in, {threads} threads")
+    print(f"{'hasher':<10} {'login':<12} {'first logins/s':>15} {'repeat logins/s':>16}")
+    with workdir, common.test_database():
+        for hasher, hashers in (('pbkdf2', None), ('md5', FAST_HASHERS)):
+            with override_settings(**({'PASSWORD_HASHERS': hashers} if hashers else {})):
+                for stateless in (False, True):
+                    # Fresh users each run, so every first login writes last_login
+                    usernames = [common.create_user(f'{hasher}{stateless:d}u{i}').username for i in range(users)]
+                    with override_settings(AUTH_STATELESS_LOGIN=stateless):
+                        first, repeat = burst(usernames, threads), burst(usernames, threads)
+                    print(f"{hasher:<10} {'stateless' if stateless else 'session':<12} {first:>15.1f} {repeat:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Benchmark keyword matching latency per request
+Compares the compiled automaton against the old per-keyword substring scan
+at 10, 1k and 50k rules.
+"""
+
+import random
+import string
+import time
+
+import common  # noqa: F401  (configures Django)
+
+from api.matcher import KeywordMatcher
+
+RULE_COUNTS = [10, 1_000, 50_000]
+REQUESTS = 200
+TEXT_LENGTH = 2_000
+
+
+def random_word(rng, min_len=4, max_len=12):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(min_len, max_len)))
+
+
+def naive_scan(keywords, text):
+    """The original per-keyword substring scan"""
+    text = text.lower()
+    return [keyword for keyword in keywords if keyword in text]
+
+
+def time_per_request(func, texts):
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    return (time.perf_counter() - start) / len(texts) * 1000
+
+
+def main():
+    rng = random.Random(42)
+    texts = []
+    for _ in range(REQUESTS):
+        words = []
+        while sum(len(word) + 1 for word in words) < TEXT_LENGTH:
+            words.append(random_word(rng, 2, 10))
+        texts.append(' '.join(words))
+
+    print(f"{'rules':>8} {'compile (s)':>12} {'automaton (ms)':>15} {'naive (ms)':>12}")
+    for count in RULE_COUNTS:
+        keywords = [random_word(rng) for _ in range(count)]
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        compile_time = time.perf_counter() - start
+
+        automaton_ms = time_per_request(matcher.scan, texts)
+        naive_ms = time_per_request(lambda text: naive_scan(keywords, text), texts)
+
+        print(f"{count:>8} {compile_time:>12.3f} {automaton_ms:>15.3f} {naive_ms:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""
+Load benchmark for POST /api/moderate/
+Measures single-worker throughput with the default rule backend and the
+opt-in simulated latency backend. The verdict cache is off, otherwise every
+request after the first would replay the cached verdict for the payload.
+"""
+
+import time
+
+import common
+
+from django.test import override_settings
+
+BACKENDS = [
+    ('api.backends.RuleBasedBackend', 500),
+    ('api.backends.SimulatedLatencyBackend', 20),
+]
+
+
+def run(client, requests):
+    payload = {'input_type': 'text', 'input_value': 'Limited offer, totally not a scam!'}
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.post('/api/moderate/', payload, format='json')
+        assert response.status_code == 200, response.content
+    return time.perf_counter() - start
+
+
+def main():
+    with common.test_database():
+        client = common.authenticated_client(common.create_user())
+
+        print(f"{'backend':<40} {'requests':>9} {'req/s':>9} {'avg ms':>9}")
+        for backend, requests in BACKENDS:
+            with override_settings(MODERATION_BACKEND=backend, MODERATION_VERDICT_CACHE_ENABLED=False):
+                elapsed = run(client, requests)
+            print(f"{backend:<40} {requests:>9} {requests / elapsed:>9.1f} {elapsed / requests * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
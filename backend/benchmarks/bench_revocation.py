@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Refresh token revocation benchmark
+Seeds the RevokedToken table with a week of revocations, then reports the
+per-process filter's load time and size, the cost of checking a token that
+was never revoked through the filter versus a primary key lookup, the
+false positive rate, full POST /api/auth/refresh/ round trips, and how long
+purge_revoked_tokens takes to delete the expired half.
+
+Usage: python bench_revocation.py [revoked_tokens] [checks]
+"""
+
+import sys
+import time
+import uuid
+from datetime import timedelta
+
+import common
+
+from django.test import Client
+from django.utils import timezone
+
+from api import revocation
+from api.models import RevokedToken
+from api.tokens import PrincipalRefreshToken
+
+
+def seed(count):
+    # Half already expired, half spread over the next week
+    now = timezone.now()
+    RevokedToken.objects.bulk_create(
+        [
+            RevokedToken(jti=uuid.uuid4(), expires_at=now + timedelta(seconds=(i % 14 - 7) * 86400 + 3600))
+            for i in range(count)
+        ],
+        batch_size=5000,
+    )
+
+
+def timed(check, tokens):
+    start = time.perf_counter()
+    for token in tokens:
+        check(token)
+    return (time.perf_counter() - start) / len(tokens) * 1_000_000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    checks = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    with common.test_database():
+        user = common.create_user()
+        seed(count)
+
+        revocation.revocation_filter.cache_clear()
+        start = time.perf_counter()
+        revoked = revocation.revocation_filter()
+        load = time.perf_counter() - start
+        size = sum(len(bloom._bits) for bloom in revoked._days.values())
+        print(f"{count} revoked, {len(revoked)} unexpired loaded in {load:.2f}s, "
+              f"{len(revoked._days)} day filters, {size / 1024:.0f} KiB")
+
+        tokens = [PrincipalRefreshToken.for_user(user) for _ in range(checks)]
+        lookup = timed(lambda token: RevokedToken.objects.filter(jti=token['jti']).exists(), tokens)
+        filtered = timed(revocation.is_revoked, tokens)
+        false_positives = sum(
+            revoked.might_contain(uuid.UUID(token['jti']), token['exp']) for token in tokens
+        )
+        print(f"{'check':<14} {'µs/token':>9}")
+        print(f"{'table lookup':<14} {lookup:>9.1f}")
+        print(f"{'filter':<14} {filtered:>9.1f}   {false_positives} false positives in {checks}")
+
+        client = Client()
+        start = time.perf_counter()
+        for token in tokens[:1000]:
+            response = client.post('/api/auth/refresh/', {'refresh': str(token)}, content_type='application/json')
+            assert response.status_code == 200, response.content
+        print(f"refresh round trip: {(time.perf_counter() - start) / min(checks, 1000) * 1000:.2f} ms")
+
+        start = time.perf_counter()
+        deleted = revocation.purge_expired()
+        print(f"purged {deleted} expired in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
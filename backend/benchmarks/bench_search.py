@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Search benchmark for moderation content
+Seeds logs with generated post text and times a word search through
+ILIKE '%term%' scans, as the admin used to run it, against the full-text
+index, for a common word and a rare one.
+
+Usage: python bench_search.py [rows]
+"""
+
+import random
+import sys
+import time
+
+import common
+
+from django.db.models import Q
+
+from api import search
+from api.models import ModerationLog
+
+WORDS = (
+    'sponsored giveaway skincare routine morning coffee workout travel deal discount '
+    'link bio follow share like summer launch review unboxing haul recipe vegan fitness'
+).split()
+
+
+def seed(user, rows):
+    rng = random.Random(7)
+    logs = []
+    for index in range(rows):
+        words = rng.choices(WORDS, k=20)
+        if index % 5000 == 0:
+            words.append('cryptowallet')
+        logs.append(ModerationLog(user=user, input_type='text', input_value=' '.join(words), result='safe'))
+    ModerationLog.objects.bulk_create(logs, batch_size=2000)
+
+
+def timed(run, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        count = run()
+    return (time.perf_counter() - start) / repeat * 1000, count
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    with common.test_database():
+        user = common.create_user()
+        seed(user, rows)
+
+        print(f"{rows} logs")
+        print(f"{'query':<16} {'method':<22} {'ms':>9} {'matches':>8}")
+        for term in ('giveaway', 'cryptowallet'):
+            like = Q(input_value__icontains=term) | Q(notes__icontains=term)
+            for method, run in (
+                ('ILIKE count', lambda: ModerationLog.objects.filter(like).count()),
+                ('full-text count', lambda: ModerationLog.objects.filter(search.matches(term)).count()),
+                ('ILIKE first 20', lambda: len(ModerationLog.objects.filter(like)[:20])),
+                ('ranked top 20', lambda: len(search.search(term, user.pk))),
+            ):
+                elapsed, count = timed(run)
+                print(f"{term:<16} {method:<22} {elapsed:>9.1f} {count:>8}")
+
+
+if __name__ == '__main__':
+    main()
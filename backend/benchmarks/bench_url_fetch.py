@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Throughput benchmark for URL page fetching
+Fetches URLs spread over several local stand-in hosts that each answer
+after a fixed delay, one at a time and then with the concurrent fetcher,
+and finally through POST /api/moderate/batch/ with PageFetchingBackend.
+
+Usage: python bench_url_fetch.py [urls]
+"""
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import common
+
+from django.test import override_settings
+
+from api.fetcher import Fetcher
+
+HOSTS = 10
+LATENCY = 0.05
+PAGE = b'<html><title>Listing</title><body>Genuine leather bags</body></html>'
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_hosts():
+    servers = []
+    for _ in range(HOSTS):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {count:>6} {elapsed:>9.2f} {count / elapsed:>9.1f}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    servers = start_hosts()
+    urls = [
+        f'http://127.0.0.1:{servers[n % HOSTS].server_port}/listing/{n}'
+        for n in range(count)
+    ]
+
+    print(f"{HOSTS} hosts, {LATENCY * 1000:.0f}ms per response")
+    print(f"{'mode':<34} {'urls':>6} {'seconds':>9} {'urls/s':>9}")
+
+    sequential = Fetcher(max_connections=1, per_host=1, allow_private=True)
+    timed('sequential (1 connection)', count // 10, lambda: [
+        sequential.fetch_many([url]) for url in urls[:count // 10]
+    ])
+    sequential.close()
+
+    concurrent = Fetcher(allow_private=True)
+    timed('concurrent (8 per host)', count, lambda: concurrent.fetch_many(urls))
+    timed('concurrent, cached', count, lambda: concurrent.fetch_many(urls))
+    print(f"connections opened: {concurrent.connections_opened}")
+    concurrent.close()
+
+    with common.test_database(), override_settings(
+        MODERATION_BACKEND='api.backends.PageFetchingBackend',
+        MODERATION_FETCH_ALLOW_PRIVATE=True,
+        MODERATION_VERDICT_CACHE_ENABLED=False,
+    ):
+        client = common.authenticated_client(common.create_user())
+        items = [{'input_type': 'url', 'input_value': f'{url}?batch=1'} for url in urls]
+
+        def post_batch():
+            response = client.post('/api/moderate/batch/', {'items': items}, format='json')
+            assert response.status_code == 200, response.content
+
+        timed('batch endpoint', count, post_batch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Per-request overhead benchmark for API usage logging
+Runs UsageLogMiddleware around a view that returns at once, with logging
+disabled, buffered for the background flush thread, and with one INSERT
+per request for comparison, then reports how fast the buffer drains.
+
+Usage: python bench_usage_log.py [requests]
+"""
+
+import sys
+import time
+
+import common
+
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from api.models import APIUsageLog
+from api.usage import UsageLogMiddleware, get_usage_buffer
+
+
+def make_request(user):
+    request = RequestFactory().get('/api/dashboard/', REMOTE_ADDR='127.0.0.1', HTTP_USER_AGENT='bench')
+    request.resolver_match = resolve('/api/dashboard/')
+    request.user = user
+    return request
+
+
+def per_request_us(handler, request, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        handler(request)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    response = HttpResponse()
+
+    def view(request):
+        return response
+
+    def insert_per_request(request):
+        APIUsageLog.objects.create(
+            user=request.user, endpoint='api/dashboard/', method='GET', status_code=200,
+            response_time_ms=0, ip_address='127.0.0.1', user_agent='bench',
+        )
+        return response
+
+    with common.test_database():
+        request = make_request(common.create_user())
+        middleware = UsageLogMiddleware(view)
+
+        print(f"{'mode':<28} {'requests':>9} {'µs/request':>11}")
+        baseline = per_request_us(view, request, requests)
+        print(f"{'no middleware':<28} {requests:>9} {baseline:>11.2f}")
+        with override_settings(API_USAGE_LOG_ENABLED=False):
+            print(f"{'middleware, disabled':<28} {requests:>9} {per_request_us(middleware, request, requests):>11.2f}")
+
+        with override_settings(API_USAGE_LOG_ENABLED=True):
+            buffer = get_usage_buffer()
+            buffered = per_request_us(middleware, request, requests)
+            print(f"{'middleware, buffered':<28} {requests:>9} {buffered:>11.2f}")
+
+            start = time.perf_counter()
+            buffer.close()
+            drained = time.perf_counter() - start
+            print(f"{'sync INSERT per request':<28} {requests // 10:>9} "
+                  f"{per_request_us(insert_per_request, request, requests // 10):>11.2f}")
+
+        print(f"\nbuffered overhead: {buffered - baseline:.2f}µs per request")
+        print(f"rows written: {buffer.written}, dropped when full: {buffer.dropped}, "
+              f"final drain {drained * 1000:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
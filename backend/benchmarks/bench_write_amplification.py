@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Write-amplification benchmark for moderation persistence
+Compares the previous INSERT-then-UPDATE flow with the single INSERT used
+by ContentModerationView. Runs on the configured database; on PostgreSQL
+the WAL bytes generated per request are reported as well.
+"""
+
+import time
+
+import common
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.backends import get_moderation_backend
+from api.models import ModerationLog
+
+REQUESTS = 500
+ITEM = {'input_type': 'text', 'input_value': 'Limited offer, totally not a scam!'}
+
+
+def legacy_flow(user):
+    moderation_log = ModerationLog.objects.create(user=user, **ITEM)
+    result_data = get_moderation_backend().moderate(ITEM['input_type'], ITEM['input_value'])
+    for field, value in result_data.items():
+        setattr(moderation_log, field, value)
+    moderation_log.processing_time_ms = 1
+    moderation_log.save()
+
+
+def single_write_flow(user):
+    moderation_log = ModerationLog(user=user, **ITEM)
+    result_data = get_moderation_backend().moderate(ITEM['input_type'], ITEM['input_value'])
+    for field, value in result_data.items():
+        setattr(moderation_log, field, value)
+    moderation_log.processing_time_ms = 1
+    moderation_log.save()
+
+
+def wal_position():
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_current_wal_lsn()')
+        lsn = cursor.fetchone()[0]
+    high, low = lsn.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def measure(flow, user):
+    wal_start = wal_position()
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            flow(user)
+        elapsed = time.perf_counter() - start
+    wal_end = wal_position()
+
+    writes = sum(1 for query in queries if query['sql'].startswith(('INSERT', 'UPDATE')))
+    wal_bytes = (wal_end - wal_start) / REQUESTS if wal_start is not None else None
+    return writes / REQUESTS, elapsed / REQUESTS * 1000, wal_bytes
+
+
+def main():
+    with common.test_database():
+        user = common.create_user()
+        print(f'Database: {connection.vendor}')
+        print(f"{'flow':<14} {'writes/req':>11} {'ms/req':>8} {'WAL bytes/req':>14}")
+        for name, flow in [('insert+update', legacy_flow), ('single insert', single_write_flow)]:
+            writes, elapsed, wal_bytes = measure(flow, user)
+            wal = f'{wal_bytes:>14.0f}' if wal_bytes is not None else f"{'n/a':>14}"
+            print(f'{name:<14} {writes:>11.1f} {elapsed:>8.3f} {wal}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Shared setup for the benchmark scripts
+Each benchmark runs against a throwaway test database so the development
+db.sqlite3 is never touched.
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'brandsafe_backend.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def test_database():
+    """Create a fresh test database for the duration of the block"""
+    from django.conf import settings
+    from django.test import override_settings
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    # The usage log flush thread would contend with the benchmark for the
+    # in-memory database; bench_usage_log.py measures it on its own.
+    # Scopes without a rate are not throttled, so load tests are not cut off.
+    unthrottled = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+    try:
+        with override_settings(API_USAGE_LOG_ENABLED=False, REST_FRAMEWORK=unthrottled):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def create_user(username='bench', role='influencer'):
+    from api.models import UserProfile
+
+    return UserProfile.objects.create_user(
+        username=username,
+        password='benchpass123!',
+        email=f'{username}@brandsafe.com',
+        role=role,
+    )
+
+
+def authenticated_client(user):
+    """Return an APIClient carrying a real JWT for ``user``"""
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'brandsafe_backend.settings')
 
 application = get_asgi_application()
+
+from api.imageindex import warm_image_index  # noqa: E402
+
+warm_image_index()
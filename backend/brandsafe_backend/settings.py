@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.usage.UsageLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,13 +85,69 @@ WSGI_APPLICATION = 'brandsafe_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE selects 'sqlite' (single node, the default) or 'postgresql'
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgresql':
+    # Django's psycopg 3 pool replaces persistent connections; Django refuses
+    # to combine the two. Off by default as psycopg[pool] is not a dependency
+    DB_POOL = config('DB_POOL', default=False, cast=bool)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='brandsafe'),
+            'USER': config('DB_USER', default='brandsafe'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            # Transaction-mode PgBouncer cannot hold the cursors history exports stream from
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+            'OPTIONS': {
+                'pool': {
+                    'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+                    'max_size': config('DB_POOL_MAX_SIZE', default=20, cast=int),
+                    'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),  # Seconds
+                } if DB_POOL else False,
+            },
+        }
+    }
+else:
+    # WAL lets readers run alongside the single writer, NORMAL only syncs at
+    # checkpoints, and IMMEDIATE takes the write lock up front so waiting
+    # writers queue on the busy timeout instead of failing mid-transaction
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': config('DB_BUSY_TIMEOUT', default=20, cast=float),  # Seconds
+                'transaction_mode': config('DB_SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+                'init_command': (
+                    f"PRAGMA journal_mode={config('DB_SQLITE_JOURNAL_MODE', default='WAL')};"
+                    f"PRAGMA synchronous={config('DB_SQLITE_SYNCHRONOUS', default='NORMAL')}"
+                ),
+            },
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='brandsafe'),
     }
 }
 
+# Seconds a cached dashboard payload may live before it is recomputed
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=60, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,7 +200,7 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -153,6 +210,17 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.SlidingWindowRateThrottle',
+    ],
+    # Per view throttle_scope; '<scope>_<role>' overrides the scope's rate for that role
+    'DEFAULT_THROTTLE_RATES': {
+        'moderate': config('THROTTLE_MODERATE_RATE', default='120/min'),
+        'moderate_admin': config('THROTTLE_MODERATE_ADMIN_RATE', default='1200/min'),
+        'moderate_batch': config('THROTTLE_MODERATE_BATCH_RATE', default='20/min'),
+        'moderate_batch_admin': config('THROTTLE_MODERATE_BATCH_ADMIN_RATE', default='200/min'),
+        'export': config('THROTTLE_EXPORT_RATE', default='10/hour'),
+    },
 }
 
 # JWT Configuration
@@ -161,13 +229,15 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # Logins go through UserLoginView, which updates last_login itself
+    'UPDATE_LAST_LOGIN': False,
     
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
+    'TOKEN_REFRESH_SERIALIZER': 'api.tokens.PrincipalTokenRefreshSerializer',
 }
 
 # CORS Configuration
@@ -192,3 +262,92 @@ SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
     'JSON_EDITOR': True,
 }
+
+# Content Moderation Configuration
+MODERATION_KEYWORDS = config(
+    'MODERATION_KEYWORDS',
+    default='spam,scam,fake,counterfeit,pirated,stolen,illegal,fraud,phishing,malware,virus',
+    cast=Csv()
+)
+MODERATION_RULES_FILE = config('MODERATION_RULES_FILE', default='')  # One keyword per line
+MODERATION_CASE_FOLD = config('MODERATION_CASE_FOLD', default=True, cast=bool)
+MODERATION_WHOLE_WORD = config('MODERATION_WHOLE_WORD', default=False, cast=bool)
+
+# Dotted path to a ModerationBackend subclass. Use
+# 'api.backends.SimulatedLatencyBackend' for demos only.
+MODERATION_BACKEND = config('MODERATION_BACKEND', default='api.backends.RuleBasedBackend')
+MODERATION_BATCH_MAX_ITEMS = config('MODERATION_BATCH_MAX_ITEMS', default=500, cast=int)
+MODERATION_SIMULATED_LATENCY_MS = config('MODERATION_SIMULATED_LATENCY_MS', default='100,500', cast=Csv(int))
+
+# Asynchronous moderation (?mode=async) and the run_moderation_workers pool
+MODERATION_JOB_LEASE_SECONDS = config('MODERATION_JOB_LEASE_SECONDS', default=60, cast=int)
+MODERATION_JOB_MAX_ATTEMPTS = config('MODERATION_JOB_MAX_ATTEMPTS', default=3, cast=int)
+# Each waiting poll holds a sync worker, so keep the cap short
+MODERATION_LONG_POLL_MAX_SECONDS = config('MODERATION_LONG_POLL_MAX_SECONDS', default=5, cast=float)
+MODERATION_LONG_POLL_INTERVAL = 0.25
+
+# Verdict cache for repeated content, keyed by content hash and ruleset version
+MODERATION_VERDICT_CACHE_ENABLED = config('MODERATION_VERDICT_CACHE_ENABLED', default=True, cast=bool)
+MODERATION_VERDICT_CACHE_SIZE = config('MODERATION_VERDICT_CACHE_SIZE', default=10000, cast=int)  # Per-process LRU entries
+MODERATION_VERDICT_CACHE_TTL = config('MODERATION_VERDICT_CACHE_TTL', default=7 * 24 * 3600, cast=int)  # Seconds
+
+# Image uploads are streamed to disk and rejected as soon as a limit is exceeded
+MODERATION_IMAGE_MAX_BYTES = config('MODERATION_IMAGE_MAX_BYTES', default=25 * 1024 * 1024, cast=int)
+MODERATION_IMAGE_MAX_PIXELS = config('MODERATION_IMAGE_MAX_PIXELS', default=40_000_000, cast=int)
+MODERATION_IMAGE_FORMATS = config('MODERATION_IMAGE_FORMATS', default='JPEG,PNG,GIF,WEBP', cast=Csv())
+
+# Near-duplicate detection for images via perceptual hashes
+MODERATION_PHASH_ENABLED = config('MODERATION_PHASH_ENABLED', default=True, cast=bool)
+MODERATION_PHASH_MAX_DISTANCE = config('MODERATION_PHASH_MAX_DISTANCE', default=6, cast=int)  # Hamming bits of 64
+MODERATION_PHASH_INDEX_REFRESH = config('MODERATION_PHASH_INDEX_REFRESH', default=30, cast=int)  # Seconds
+
+# URL page fetching for api.backends.PageFetchingBackend
+MODERATION_FETCH_MAX_CONNECTIONS = config('MODERATION_FETCH_MAX_CONNECTIONS', default=100, cast=int)
+MODERATION_FETCH_PER_HOST = config('MODERATION_FETCH_PER_HOST', default=8, cast=int)
+MODERATION_FETCH_TIMEOUT = config('MODERATION_FETCH_TIMEOUT', default=10.0, cast=float)  # Seconds per URL, redirects included
+MODERATION_FETCH_MAX_BYTES = config('MODERATION_FETCH_MAX_BYTES', default=1024 * 1024, cast=int)
+MODERATION_FETCH_MAX_REDIRECTS = config('MODERATION_FETCH_MAX_REDIRECTS', default=5, cast=int)
+MODERATION_FETCH_CACHE_SIZE = config('MODERATION_FETCH_CACHE_SIZE', default=10000, cast=int)
+MODERATION_FETCH_CACHE_TTL = config('MODERATION_FETCH_CACHE_TTL', default=300, cast=int)  # Seconds
+MODERATION_FETCH_ALLOW_PRIVATE = config('MODERATION_FETCH_ALLOW_PRIVATE', default=False, cast=bool)
+MODERATION_FETCH_USER_AGENT = config('MODERATION_FETCH_USER_AGENT', default='BrandSafeGuardian/1.0')
+
+# Serve /api/health/, /api/moderate/ and /api/dashboard/ with native async views (run under ASGI)
+ASYNC_API_VIEWS = config('ASYNC_API_VIEWS', default=False, cast=bool)
+
+# API usage logging, buffered in memory and written in batches by a background thread
+API_USAGE_LOG_ENABLED = config('API_USAGE_LOG_ENABLED', default=True, cast=bool)
+API_USAGE_LOG_BUFFER_SIZE = config('API_USAGE_LOG_BUFFER_SIZE', default=10000, cast=int)  # Oldest rows are dropped beyond this
+API_USAGE_LOG_BATCH_SIZE = config('API_USAGE_LOG_BATCH_SIZE', default=500, cast=int)
+API_USAGE_LOG_FLUSH_INTERVAL = config('API_USAGE_LOG_FLUSH_INTERVAL', default=2.0, cast=float)  # Seconds
+
+# Retention: finished moderation logs older than this move to compressed monthly archives
+MODERATION_ARCHIVE_AFTER_DAYS = config('MODERATION_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+MODERATION_ARCHIVE_DIR = config('MODERATION_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+
+# History exports read this many rows per round trip from a server-side cursor
+MODERATION_EXPORT_CHUNK_SIZE = config('MODERATION_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Admin changelists for the log tables estimate unfiltered counts and cap filtered ones
+ADMIN_COUNT_LIMIT = config('ADMIN_COUNT_LIMIT', default=10000, cast=int)
+ADMIN_COUNT_CACHE_TTL = config('ADMIN_COUNT_CACHE_TTL', default=300, cast=int)  # Seconds
+
+# Authenticated users are read from a per-process LRU in front of the shared cache.
+# Changes reach other processes within JWT_USER_CACHE_LOCAL_TTL seconds.
+JWT_USER_CACHE_ENABLED = config('JWT_USER_CACHE_ENABLED', default=True, cast=bool)
+JWT_USER_CACHE_SIZE = config('JWT_USER_CACHE_SIZE', default=10000, cast=int)
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=300, cast=int)  # Seconds, shared cache
+JWT_USER_CACHE_LOCAL_TTL = config('JWT_USER_CACHE_LOCAL_TTL', default=5, cast=int)  # Seconds, per process
+# Take role and verification from access token claims without any lookup
+JWT_TRUST_ROLE_CLAIM = config('JWT_TRUST_ROLE_CLAIM', default=False, cast=bool)
+
+# /api/auth/login/ issues tokens without creating a session. last_login is
+# written at most once per LAST_LOGIN_UPDATE_INTERVAL seconds per user.
+AUTH_STATELESS_LOGIN = config('AUTH_STATELESS_LOGIN', default=True, cast=bool)
+LAST_LOGIN_UPDATE_INTERVAL = config('LAST_LOGIN_UPDATE_INTERVAL', default=900, cast=int)  # Seconds
+
+# Rotated refresh tokens are revoked in api.RevokedToken until they expire.
+# Each process checks them against Bloom filters sized for this many
+# revocations per day of expiry; purge expired rows with purge_revoked_tokens.
+TOKEN_REVOCATION_FILTER_CAPACITY = config('TOKEN_REVOCATION_FILTER_CAPACITY', default=100000, cast=int)
+TOKEN_REVOCATION_FILTER_ERROR_RATE = config('TOKEN_REVOCATION_FILTER_ERROR_RATE', default=0.001, cast=float)
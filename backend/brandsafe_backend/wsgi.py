@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'brandsafe_backend.settings')
 
 application = get_wsgi_application()
+
+from api.imageindex import warm_image_index  # noqa: E402
+
+warm_image_index()